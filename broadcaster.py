@@ -1,16 +1,118 @@
 #!/usr/bin/env python3
 # broadcaster.py — helper to fan-out key sequences / typed chars, with 2 modes:
-#   - "background": use xdotool --window (may be ignored by some apps)
-#   - "focus_sweep": briefly focus each window, inject, then restore focus (reliable)
+#   - "background": XSendEvent to each window (may be ignored by some apps)
+#   - "focus_sweep": briefly focus each window, inject, then restore focus (reliable).
+#     Focus goes through libxdo, else x11_utils.activate_window (_NET_ACTIVE_WINDOW
+#     plus a poll; no desktop switch), or one chained `xdotool windowactivate --sync`.
+# UInputBroadcaster (config broadcast_mode "uinput") focus-sweeps through /dev/uinput.
 
+import os
+import queue
 import subprocess
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from Xlib import X, XK, display
+from Xlib.protocol import event as xevent
 
 import x11_utils  # used for focusing/restoring and fetching titles
 
 logger = logging.getLogger(__name__)
 
+_CURRENTWINDOW = 0  # libxdo: act on whatever window has focus
+
+# modifier names in a key sequence -> X state mask, for XSendEvent
+_XSEND_MODS = {
+    "shift": X.ShiftMask, "ctrl": X.ControlMask, "control": X.ControlMask,
+    "alt": X.Mod1Mask, "super": X.Mod4Mask, "meta": X.Mod4Mask, "win": X.Mod4Mask,
+}
+
+_FAN_OUT_WORKERS = 8  # background-mode send threads (each with its own libxdo handle)
+
+# keysym value -> keysym name (e.g. 0x2c -> "comma"), to send literals with `xdotool key`
+_KEYSYM_NAMES = {}
+for _name, _val in vars(XK).items():
+    if _name.startswith("XK_"):
+        _KEYSYM_NAMES.setdefault(_val, _name[3:])
+
+
+def _without(targets, exclude):
+    """targets minus exclude; callers that pre-filter pass exclude=None and skip the copy."""
+    if not exclude:
+        return targets
+    return [wid for wid in targets if wid != exclude]
+
+
+def _raise_thread_priority():
+    """
+    Best effort: make the calling thread real-time (SCHED_RR), else nicer than
+    the rest of the app, so sweeps aren't delayed by the scheduler under load.
+    Both need privileges (CAP_SYS_NICE / RLIMIT_RTPRIO) and are skipped otherwise.
+    """
+    try:
+        os.sched_setscheduler(0, os.SCHED_RR, os.sched_param(20))
+        return
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.nice(-5)
+    except OSError:
+        logger.debug("could not raise focus-sweep thread priority")
+
+
+class _XdoBackend:
+    """
+    Key injection backend.
+    Uses libxdo in-process (python-libxdo) when it can be loaded, so a key is a
+    function call instead of an xdotool fork+exec; otherwise falls back to the
+    xdotool CLI through x11_utils.
+    """
+
+    def __init__(self, x11_module):
+        self.x11 = x11_module
+        self._xdo = None
+        try:
+            from xdo import Xdo
+            self._xdo = Xdo()
+        except Exception:
+            logger.info("python-libxdo not available, using xdotool CLI")
+
+    def in_process(self) -> bool:
+        return self._xdo is not None
+
+    def activate(self, wid):
+        if self._xdo is not None:
+            self._xdo.activate_window(int(wid))
+            self._xdo.wait_for_window_active(int(wid))
+        else:
+            self.x11.activate_window(wid)
+
+    def key(self, seq, wid=None):
+        """Send a key sequence ("alt+a", "Return") to wid, or to the focused window."""
+        if self._xdo is not None:
+            self._xdo.send_keysequence_window(int(wid) if wid else _CURRENTWINDOW, seq.encode(), 0)
+        elif wid:
+            self.x11.send_key_to_window(wid, seq)
+        else:
+            subprocess.run(
+                ["xdotool", "key", "--clearmodifiers", "--delay", "0", "--", seq],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+    def type(self, text, wid=None):
+        """Type literal text into wid, or into the focused window."""
+        if self._xdo is not None:
+            self._xdo.enter_text_window(int(wid) if wid else _CURRENTWINDOW, text.encode(), 0)
+            return
+        cmd = ["xdotool", "type"]
+        if wid:
+            cmd += ["--window", str(wid)]
+        cmd += ["--clearmodifiers", "--delay", "0", "--", text]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
 
 class Broadcaster:
     def __init__(self, x11_module, enabled: bool = False, mode: str = "focus_sweep"):
@@ -20,10 +122,26 @@ class Broadcaster:
         self.x11 = x11_module
         self._enabled = bool(enabled)
         self._mode = mode if mode in ("background", "focus_sweep") else "focus_sweep"
+        self._xdo = _XdoBackend(x11_module)
+
+        # Focus-sweep waits on an X round-trip instead of fixed sleeps
+        self._d = None
+
+        # wmctrl titles are only used for debug logs; keep them briefly
+        self._wm_cache = (0.0, {})   # (monotonic timestamp, wmctrl_list())
+        self._wm_cache_ttl = 0.25
 
-        # Tunables for focus-sweep
-        self._focus_settle_ms = 10   # tiny wait after focusing a window
-        self._restore_settle_ms = 6  # tiny wait after restoring original focus
+        # Background mode: XSendEvent batch without libxdo, else a small pool (created on first use)
+        self._bg_d = None
+        self._pool = None
+        self._tls = threading.local()
+
+        # Focus sweeps run one at a time on a dedicated, higher-priority thread
+        self._injection_guard = nullcontext
+        self._chain_ok = True  # False once xdotool couldn't be spawned for a chained sweep
+        self._sweeps = queue.Queue()
+        self._sweep_thread = threading.Thread(target=self._sweep_worker, name="focus-sweep", daemon=True)
+        self._sweep_thread.start()
 
     # ---- external control ----
     def set_enabled(self, enabled: bool):
@@ -35,6 +153,16 @@ class Broadcaster:
     def is_focus_sweep(self) -> bool:
         return self._mode == "focus_sweep"
 
+    def set_injection_guard(self, guard):
+        """guard(): context manager held while a focus sweep injects keys."""
+        self._injection_guard = guard
+
+    def stop(self):
+        self._sweeps.put(None)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
     # ---- public API used by CoreController ----
     def send_key(self, seq: str, targets, exclude=None):
         if not self._enabled or not seq:
@@ -42,7 +170,7 @@ class Broadcaster:
         if self._mode == "background":
             self._send_key_background(seq, targets, exclude)
         else:
-            self._send_key_focus_sweep(seq, targets, exclude)
+            self._sweeps.put((self._send_key_focus_sweep, seq, tuple(targets), exclude))
 
     def send_literal(self, ch: str, targets, exclude=None):
         if not self._enabled or not ch:
@@ -50,97 +178,366 @@ class Broadcaster:
         if self._mode == "background":
             self._send_literal_background(ch, targets, exclude)
         else:
-            self._send_literal_focus_sweep(ch, targets, exclude)
+            self._sweeps.put((self._send_literal_focus_sweep, ch, tuple(targets), exclude))
 
     # ---------- BACKEND: background (per-window) ----------
     def _send_key_background(self, seq, targets, exclude):
-        wmap = self._wm_titles_safe()
-        for wid in targets:
-            if exclude and wid == exclude:
-                continue
-            title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1]
-            try:
-                logger.debug("SEND KEY (background) -> win=%s title=%r seq=%r", wid, title, seq)
-                self.x11.send_key_to_window(wid, seq)
-            except Exception:
-                logger.exception("KEY background failed to %s (%r)", wid, title)
+        wids = _without(targets, exclude)
+        self._log_sends("KEY (background)", wids, seq)
+        if not self._xdo.in_process():
+            if not self._background_xsend(seq, wids):
+                self._background_chained(seq, wids)
+            return
+        self._fan_out("key", seq, wids)
 
     def _send_literal_background(self, ch, targets, exclude):
-        wmap = self._wm_titles_safe()
-        for wid in targets:
-            if exclude and wid == exclude:
-                continue
-            title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1]
-            try:
-                logger.debug("SEND TYPE (background) -> win=%s title=%r char=%r", wid, title, ch)
-                subprocess.run(
-                    ["xdotool", "type", "--window", str(wid), "--clearmodifiers", "--delay", "0", "--", ch],
-                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-            except Exception:
-                logger.exception("TYPE background failed to %s (%r)", wid, title)
+        wids = _without(targets, exclude)
+        self._log_sends("TYPE (background)", wids, ch)
+        keysym_name = _KEYSYM_NAMES.get(ord(ch)) if len(ch) == 1 else None
+        if not self._xdo.in_process() and keysym_name:
+            if not self._background_xsend(keysym_name, wids):
+                self._background_chained(keysym_name, wids, clearmodifiers=True)
+            return
+        self._fan_out("type", ch, wids)
+
+    def _background_xsend(self, seq, wids):
+        """
+        Without libxdo: build the KeyPress/KeyRelease pair once and XSendEvent it
+        to every target (what 'xdotool key --window' does), then flush once for
+        the whole broadcast. Returns False if seq can't be mapped to a keycode, so
+        the caller falls back to the xdotool CLI.
+        """
+        if not wids:
+            return True
+        try:
+            d = self._bg_display()
+            self._refresh_bg_keymap(d)
+            *mods, keyname = seq.split("+")
+            keysym = XK.string_to_keysym(keyname)
+            keycode = d.keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                return False
+            state = 0
+            for m in mods:
+                state |= _XSEND_MODS.get(m.lower(), 0)
+            if d.keycode_to_keysym(keycode, 0) != keysym and d.keycode_to_keysym(keycode, 1) == keysym:
+                state |= X.ShiftMask  # e.g. "exclam" lives on the shifted level of "1"
+            root = d.screen().root
+            for wid in wids:
+                win = d.create_resource_object("window", int(wid))
+                for ev_class, mask in ((xevent.KeyPress, X.KeyPressMask), (xevent.KeyRelease, X.KeyReleaseMask)):
+                    win.send_event(ev_class(
+                        time=X.CurrentTime, root=root, window=win, same_screen=1, child=X.NONE,
+                        root_x=0, root_y=0, event_x=0, event_y=0, state=state, detail=keycode,
+                    ), event_mask=mask, propagate=True)
+            d.flush()
+            return True
+        except Exception:
+            logger.exception("XSendEvent broadcast of %r failed", seq)
+            return False
+
+    def _bg_display(self):
+        """Xlib connection for background sends (only the key listener thread sends)."""
+        if self._bg_d is None:
+            self._bg_d = display.Display()
+        return self._bg_d
+
+    @staticmethod
+    def _refresh_bg_keymap(d):
+        """
+        The send connection selects no events, so all it gets is MappingNotify
+        (sent to every client): apply those, or keycodes go stale after a layout switch.
+        """
+        while d.display.event_queue or d.pending_events():
+            ev = d.next_event()
+            if ev.type == X.MappingNotify and ev.request == X.MappingKeyboard:
+                d.refresh_keyboard_mapping(ev)
+
+    def _fan_out(self, op, payload, wids):
+        """
+        In-process background send to every wid at once, one libxdo handle per
+        pool thread (Xlib connections aren't shared across threads). Waits for the
+        whole batch so consecutive keys can't overtake each other on a window.
+        """
+        if len(wids) < 2:
+            for wid in wids:
+                self._send_one(getattr(self._xdo, op), payload, wid)
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=_FAN_OUT_WORKERS, thread_name_prefix="bg-send")
+        list(self._pool.map(lambda wid: self._send_one(getattr(self._thread_xdo(), op), payload, wid), wids))
+
+    def _thread_xdo(self):
+        xdo = getattr(self._tls, "xdo", None)
+        if xdo is None:
+            xdo = self._tls.xdo = _XdoBackend(self.x11)
+        return xdo
+
+    @staticmethod
+    def _send_one(fn, payload, wid):
+        try:
+            fn(payload, wid)
+        except Exception:
+            logger.exception("%s background failed to %s", fn.__name__.upper(), wid)
+
+    def _background_chained(self, seq, wids, clearmodifiers=False):
+        """
+        CLI fallback: one xdotool process for all targets, chaining
+        'key --window W -- seq' per window (fire-and-forget, like send_key_to_window).
+        """
+        if not wids:
+            return
+        opts = ["--clearmodifiers"] if clearmodifiers else []
+        argv = ["xdotool"]
+        for wid in wids:
+            argv += ["key", "--window", str(wid), *opts, "--", seq]
+        try:
+            x11_utils.spawn_detached(argv)
+        except Exception:
+            logger.exception("KEY background failed to %s (%r)", wids, seq)
 
     # ---------- BACKEND: focus-sweep (reliable) ----------
     def _send_key_focus_sweep(self, seq, targets, exclude):
         active = self._get_active_safe()
-        wmap = self._wm_titles_safe()
+        wids = _without(targets, exclude)
+        self._log_sends("KEY (focus_sweep)", wids, seq)
+        if not self._xdo.in_process() and self._sweep_chained(seq, wids, active):
+            return
         try:
-            for wid in targets:
-                if exclude and wid == exclude:
-                    continue
-                title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1]
-                logger.debug("SEND KEY (focus_sweep) -> focus=%s title=%r seq=%r", wid, title, seq)
+            for wid in wids:
                 self._focus(wid)
-                self._settle(self._focus_settle_ms)
-                subprocess.run(
-                    ["xdotool", "key", "--clearmodifiers", "--delay", "0", "--", seq],
-                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
+                self._sync()
+                self._xdo.key(seq)
         finally:
             if active:
                 self._focus(active)
-                self._settle(self._restore_settle_ms)
+                self._sync()
 
     def _send_literal_focus_sweep(self, ch, targets, exclude):
         active = self._get_active_safe()
-        wmap = self._wm_titles_safe()
+        wids = _without(targets, exclude)
+        self._log_sends("TYPE (focus_sweep)", wids, ch)
+        keysym_name = _KEYSYM_NAMES.get(ord(ch)) if len(ch) == 1 else None
+        if not self._xdo.in_process() and keysym_name and self._sweep_chained(keysym_name, wids, active):
+            return
         try:
-            for wid in targets:
-                if exclude and wid == exclude:
-                    continue
-                title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1]
-                logger.debug("SEND TYPE (focus_sweep) -> focus=%s title=%r char=%r", wid, title, ch)
+            for wid in wids:
                 self._focus(wid)
-                self._settle(self._focus_settle_ms)
-                subprocess.run(
-                    ["xdotool", "type", "--clearmodifiers", "--delay", "0", "--", ch],
-                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
+                self._sync()
+                self._xdo.type(ch)
         finally:
             if active:
                 self._focus(active)
-                self._settle(self._restore_settle_ms)
+                self._sync()
+
+    def _sweep_chained(self, seq, wids, active):
+        """
+        Run the whole sweep as ONE chained xdotool call:
+          windowactivate --sync W1 key .. seq  windowactivate --sync W2 key .. seq  windowactivate --sync ACTIVE
+        --sync blocks until each window is really active, so no settle sleeps are needed.
+        Returns False only if xdotool can't be run at all (remembered), so the caller
+        falls back to the per-window sweep. A chain that fails midway is not retried:
+        the windows it already reached would get the key twice.
+        """
+        if not wids:
+            return True
+        if not self._chain_ok:
+            return False
+        argv = ["xdotool"]
+        for wid in wids:
+            argv += ["windowactivate", "--sync", str(wid),
+                     "key", "--clearmodifiers", "--delay", "0", "--", seq]
+        if active:
+            argv += ["windowactivate", "--sync", str(active)]
+        try:
+            subprocess.run(argv, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError as e:
+            logger.warning("chained focus sweep failed (exit %s), some windows may have missed %r", e.returncode, seq)
+        except OSError:
+            logger.warning("xdotool not runnable, using the per-window sweep")
+            self._chain_ok = False
+            return False
+        return True
+
+    def _sweep_worker(self):
+        _raise_thread_priority()
+        while True:
+            job = self._sweeps.get()
+            if job is None:
+                return
+            fn, payload, targets, exclude = job
+            try:
+                with self._injection_guard():
+                    fn(payload, targets, exclude)
+            except Exception:
+                logger.exception("focus sweep failed")
 
     # ---------- utils ----------
     def _focus(self, wid):
         try:
-            self.x11.activate_window(wid)
+            self._xdo.activate(wid)
         except Exception:
             logger.exception("activate_window failed for %s", wid)
 
     def _get_active_safe(self):
+        """
+        Active window id (decimal string) read from _NET_ACTIVE_WINDOW over the
+        sweep thread's own connection: one round trip instead of forking xdotool
+        on every swept key. Falls back to x11_utils when the property is missing.
+        """
+        try:
+            d = self._display()
+            prop = d.screen().root.get_full_property(self._net_active, X.AnyPropertyType)
+            if prop is not None and len(prop.value):
+                return str(prop.value[0]) if prop.value[0] else None
+        except Exception:
+            logger.exception("reading _NET_ACTIVE_WINDOW failed")
         try:
             return self.x11.get_active_window()
         except Exception:
             return None
 
+    def _display(self):
+        """The sweep thread's Xlib connection (never shared with other threads)."""
+        if self._d is None:
+            self._d = display.Display()
+            self._net_active = self._d.intern_atom("_NET_ACTIVE_WINDOW")
+        return self._d
+
+    def _log_sends(self, what, wids, payload):
+        """Debug-log each target with its title; no wmctrl or title lookups unless DEBUG is on."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        wmap = self._wm_titles_safe()
+        for wid in wids:
+            title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1]
+            logger.debug("SEND %s -> win=%s title=%r payload=%r", what, wid, title, payload)
+
     def _wm_titles_safe(self):
+        now = time.monotonic()
+        ts, wmap = self._wm_cache
+        if now - ts < self._wm_cache_ttl:
+            return wmap
         try:
-            return x11_utils.wmctrl_list()
+            wmap = x11_utils.wmctrl_list()
         except Exception:
-            return {}
+            wmap = {}
+        self._wm_cache = (now, wmap)
+        return wmap
 
-    @staticmethod
-    def _settle(ms):
-        if ms and ms > 0:
-            time.sleep(ms / 1000.0)
+    def _sync(self):
+        """
+        Round-trip to the X server after a focus change, so the injected keys are
+        queued behind the activation instead of after a fixed sleep.
+        """
+        try:
+            self._display().sync()
+        except Exception:
+            logger.exception("X sync failed")
+
+
+# ---------- uinput (kernel virtual keyboard) ----------
+# Our key names (see CoreController) -> evdev KEY_* names where they differ.
+# Assumes a US layout, like the lowercase chars the core hands us.
+_UINPUT_ALIASES = {
+    "alt": "LEFTALT", "ctrl": "LEFTCTRL", "control": "LEFTCTRL", "shift": "LEFTSHIFT",
+    "super": "LEFTMETA", "meta": "LEFTMETA", "win": "LEFTMETA",
+    "return": "ENTER", "escape": "ESC", "page_up": "PAGEUP", "page_down": "PAGEDOWN",
+    " ": "SPACE", ",": "COMMA", ".": "DOT", "-": "MINUS", "=": "EQUAL", ";": "SEMICOLON",
+    "'": "APOSTROPHE", "/": "SLASH", "\\": "BACKSLASH", "[": "LEFTBRACE", "]": "RIGHTBRACE",
+    "`": "GRAVE",
+}
+
+# longest wait for the X server to show a uinput press/release in its key state
+_UINPUT_SETTLE = 0.05  # seconds
+_X_KEYCODE_OFFSET = 8  # evdev code -> X keycode (evdev/libinput drivers)
+
+
+class _UInputBackend(_XdoBackend):
+    """
+    Injects keys through /dev/uinput. The kernel delivers them like a real keyboard
+    (no SendEvent flag), so apps that drop xdotool's synthetic events accept them.
+    uinput has no notion of windows: keys always go to the focused one, so this is
+    only used with the focus sweep. Activation still goes through libxdo/x11_utils.
+    """
+
+    def __init__(self, x11_module):
+        super().__init__(x11_module)
+        from evdev import UInput, ecodes  # raises ImportError if python-evdev is missing
+        self._ecodes = ecodes
+        self._codes = {
+            name[4:].lower(): code for name, code in ecodes.ecodes.items()
+            if name.startswith("KEY_") and code < ecodes.KEY_MAX
+        }
+        for ours, theirs in _UINPUT_ALIASES.items():
+            self._codes[ours] = ecodes.ecodes["KEY_" + theirs]
+        self._ui = UInput({ecodes.EV_KEY: sorted(set(self._codes.values()))}, name="multiboxer-keyboard")
+        self._kd = None  # Xlib connection for key state checks (sweep thread only)
+
+    def in_process(self) -> bool:
+        return True
+
+    def key(self, seq, wid=None):
+        codes = [self._codes.get(p.lower()) for p in seq.split("+")]
+        if wid or None in codes:
+            # can't target a window / unknown key name: let xdo handle it
+            return super().key(seq, wid)
+        self._tap(codes)
+
+    def type(self, text, wid=None):
+        codes = [self._codes.get(ch) for ch in text]
+        if wid or None in codes:
+            return super().type(text, wid)
+        for code in codes:
+            self._tap([code])
+
+    def _tap(self, codes):
+        """
+        Press codes in order (modifiers first), then release in reverse.
+        uinput writes aren't ordered with X activation: each half waits until
+        the server's key state shows it, so the tap lands before the sweep
+        moves focus on.
+        """
+        ui, ev_key = self._ui, self._ecodes.EV_KEY
+        for code in codes:
+            ui.write(ev_key, code, 1)
+        ui.syn()
+        self._settle(codes, True)
+        for code in reversed(codes):
+            ui.write(ev_key, code, 0)
+        ui.syn()
+        self._settle(codes, False)
+
+    def _settle(self, codes, down):
+        """Poll XQueryKeymap until every code is down (or up), for at most _UINPUT_SETTLE."""
+        if self._kd is None:
+            self._kd = display.Display()
+        keycodes = [code + _X_KEYCODE_OFFSET for code in codes]
+        deadline = time.monotonic() + _UINPUT_SETTLE
+        while True:
+            keymap = self._kd.query_keymap()
+            if all(bool(keymap[kc >> 3] & (1 << (kc & 7))) == down for kc in keycodes):
+                return
+            if time.monotonic() >= deadline:
+                logger.debug("uinput %s not seen by X after %.0f ms: %s",
+                             "press" if down else "release", _UINPUT_SETTLE * 1000, codes)
+                return
+            time.sleep(0.001)
+
+
+class UInputBroadcaster(Broadcaster):
+    """
+    Broadcaster that injects through a uinput virtual keyboard (python-evdev).
+    Always focus-sweeps, since uinput can only type into the focused window.
+    Falls back to the xdo backend if /dev/uinput can't be opened.
+    """
+
+    def __init__(self, x11_module, enabled: bool = False, mode: str = "focus_sweep"):
+        super().__init__(x11_module, enabled=enabled, mode="focus_sweep")
+        try:
+            self._xdo = _UInputBackend(x11_module)
+        except Exception:
+            logger.exception("uinput unavailable, falling back to xdotool")
+
+    def set_mode(self, mode: str):
+        pass  # uinput only works with focus sweep
@@ -4,13 +4,18 @@
 
 import os
 import json
+import hashlib
 import logging
 
+try:
+    import orjson  # optional, faster (de)serialization
+except ImportError:
+    orjson = None
+
 # ------------------------- CONFIG / PATHS -------------------------
 HOME = os.path.expanduser("~")
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_DIR = os.path.join(HOME, ".config", "multiboxer")
-os.makedirs(CONFIG_DIR, exist_ok=True)
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 LOG_FILE = os.path.join(SCRIPT_DIR, "debug.log")
 TMP_WINS_FILE = "/tmp/multiboxer_windows"
@@ -21,6 +26,7 @@ DEFAULT_CONFIG = {
   "pattern": "World of Warcraft",
   "broadcast_enabled": False,
   "broadcast_mode": "focus_sweep",
+  "input_backend": "pynput",
   "overlay_enabled": True,
   "overlay_color": "#00FF00",
   "overlay_bgcolor": "#000000",
@@ -41,19 +47,44 @@ DEFAULT_CONFIG = {
 
 # ------------------------- LOAD/SAVE -------------------------
 
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _dumps(config_data) -> bytes:
+    if orjson:
+        return orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+    return json.dumps(config_data, indent=2).encode()
+
+# digest of the bytes last written to CONFIG_FILE, to skip identical rewrites
+_last_written = None
+
+def _write_config(config_data) -> bool:
+    """Write atomically (temp file + rename); False if the content is already on disk."""
+    global _last_written
+    blob = _dumps(config_data)
+    digest = hashlib.blake2b(blob, digest_size=16).digest()
+    if digest == _last_written and os.path.exists(CONFIG_FILE):
+        return False
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    tmp = CONFIG_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, CONFIG_FILE)
+    _last_written = digest
+    return True
+
 def load_config():
     """Loads config from file, or creates default."""
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
+            with open(CONFIG_FILE, "rb") as f:
+                return _loads(f.read())
         except Exception:
             logging.exception("Failed to load config, falling back to default")
     
     # create default if load failed or file missing
     try:
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(DEFAULT_CONFIG, f, indent=2)
+        _write_config(DEFAULT_CONFIG)
     except Exception:
         logging.exception("Failed to create default config file")
         
@@ -62,8 +93,7 @@ def load_config():
 def save_config(config_data):
     """Saves the provided config data to the file."""
     try:
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(config_data, f, indent=2)
-        logging.info("Config saved")
+        if _write_config(config_data):
+            logging.info("Config saved")
     except Exception:
-        logging.exception("Error saving config")
\ No newline at end of file
+        logging.exception("Error saving config")
@@ -1,21 +1,104 @@
 #!/usr/bin/env python3
 # core.py — app controller (no GTK widgets here)
 
+import re
 import time
+import functools
+import operator
+import queue
+import select
 import logging
 import threading
 import string
+import sys
 from contextlib import contextmanager
+from types import MappingProxyType
 
 from pynput import keyboard
 from pynput.keyboard import Key, KeyCode
 from Xlib import X, XK, display
 from gi.repository import GLib
 
-from shortcuts import ShortcutHandler, normalize_shortcut
+from evdev_listener import EvdevListener
+from shortcuts import ShortcutHandler, strict_shortcut_tuple, MOD_ALT, MOD_CONTROL, MOD_SHIFT
 
 logger = logging.getLogger(__name__)
 
+# our key names -> xdotool keysym names (anything else passes through unchanged)
+_KEYNAME_MAP = {
+    "enter": "Return", "space": "space", "tab": "Tab", "backspace": "BackSpace",
+    **{f"f{i}": f"F{i}" for i in range(1, 25)},
+}
+
+# a rescan with the same arguments within this window reuses the previous result
+_RESCAN_REUSE = 0.2  # seconds
+
+# events handled per wake-up of the grab display watch; the rest waits a loop turn
+_MAX_EVENTS_PER_TICK = 32
+
+# overlay windows created per _sync_overlays pass; more are made on the next main loop turn
+_OVERLAYS_PER_SYNC = 4
+
+# a press right after the same key's release (no other key event in between)
+# and this soon is X auto-repeat, not the user: the repeat pair arrives within
+# a millisecond or two, while even a fast double tap is held for tens of ms
+_AUTOREPEAT_GAP = 0.03  # seconds
+
+# injected keys still expected this long after the last sweep ended (or was queued)
+_INJECT_GRACE = 0.5  # seconds
+
+# printable ASCII that can be typed as a literal (whitespace control chars excluded)
+_PRINTABLE_ORDS = frozenset(ord(c) for c in string.printable) - {0x09, 0x0a, 0x0b, 0x0c, 0x0d}
+
+
+@functools.lru_cache(maxsize=None)
+def _keysym_for(keyname: str) -> int:
+    return XK.string_to_keysym(keyname) or XK.string_to_keysym("Key_" + keyname)
+
+
+def _log_cleanup_error(what: str):
+    """Shutdown failures: one line, with the traceback only when debugging."""
+    logger.error("%s failed", what, exc_info=logger.isEnabledFor(logging.DEBUG))
+
+
+def _has_events(d) -> bool:
+    """
+    Like d.pending_events(), but answers from Xlib's already-read queue first
+    (XQLength vs XPending): only an empty queue costs a flush + socket poll.
+    """
+    return bool(d.display.event_queue) or d.pending_events() > 0
+
+
+# pynput Key -> our key name (press and release decode the same way)
+_KEY_NAMES = {
+    Key.enter: "enter", Key.space: "space", Key.tab: "tab",
+    Key.backspace: "backspace", Key.esc: "escape",
+    Key.up: "up", Key.down: "down", Key.left: "left", Key.right: "right",
+    Key.home: "home", Key.end: "end", Key.page_up: "page_up", Key.page_down: "page_down",
+    Key.delete: "delete", Key.insert: "insert",
+    Key.shift: "shift", Key.shift_l: "shift", Key.shift_r: "shift",
+    Key.ctrl: "control", Key.ctrl_l: "control", Key.ctrl_r: "control",
+    Key.alt: "alt", Key.alt_l: "alt", Key.alt_r: "alt",
+    **{getattr(Key, f"f{i}"): f"f{i}" for i in range(1, 21) if hasattr(Key, f"f{i}")},
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _key_name(key) -> str:
+    """Name for a key missing from _KEY_NAMES ("Key.caps_lock" -> "caps_lock"), memoized."""
+    return sys.intern(str(key).replace("Key.", "").lower())
+
+# shortcut modifier name -> X modifier mask
+_MODMAP = MappingProxyType({
+    "shift": X.ShiftMask, "control": X.ControlMask, "ctrl": X.ControlMask,
+    "alt": X.Mod1Mask, "mod1": X.Mod1Mask, "mod4": X.Mod4Mask,
+    "super": X.Mod4Mask, "win": X.Mod4Mask, "meta": X.Mod4Mask,
+})
+
+_ALT_KEYS = frozenset((Key.alt, Key.alt_l, Key.alt_r))
+_CTRL_KEYS = frozenset((Key.ctrl, Key.ctrl_l, Key.ctrl_r))
+_SHIFT_KEYS = frozenset((Key.shift, Key.shift_l, Key.shift_r))
+
 
 class CoreController:
     """
@@ -36,98 +119,269 @@ class CoreController:
 
         # State
         self.wins = []
+        self._wid_to_idx = {}      # win_id -> position in self.wins (also the O(1) membership test)
+        self._last_scan = (0.0, None)  # (monotonic timestamp, (pattern, prefix)) of the last rescan
+        self._targets = ((None, None), ())  # ((active, wins), wins minus active) for broadcasts
         self.overlays = {}         # win_id -> Overlay()
+        self._last_overlay_state = {}  # win_id -> (index, color, font_size, show_broadcast) last pushed
         self.original_titles = {}  # win_id -> original title
+        self._retitled = set()     # win_ids whose title we actually changed (need a restore)
         self.active_window = self.x11.get_active_window()
         self.running = False
 
+        # Hot-path copies of config values (kept in sync by the set_* methods)
+        self._broadcast_enabled = bool(self.config.get("broadcast_enabled", False))
+        self._overlay_enabled = bool(self.config.get("overlay_enabled", True))
+        self._overlay_color = self.config.get("overlay_color", "#00FF00")
+        self._overlay_font_size = self.config.get("overlay_font_size", 36000)
+
         # Input
-        self.current_keys = set()        # stores Key / KeyCode instances
+        self._mod_alt = self._mod_ctrl = self._mod_shift = False  # held modifiers
         self.pressed_names = set()       # NEW: stable names to suppress auto-repeat
-        self.inhibit_keys = set(k.strip().lower() for k in self.config.get("inhibit_keys", []))
+        self._last_release = (None, 0.0) # (key, monotonic time) of the latest release
+        self.inhibit_keys = frozenset(k.strip().lower() for k in self.config.get("inhibit_keys", []))
+        self._inhibit_combos = frozenset(filter(None, map(strict_shortcut_tuple, self.inhibit_keys)))
         self.shortcut_handler = ShortcutHandler(self.config)
+        self._parse_shortcut_grabs()
         self._mod_names = {"alt", "control", "shift", "meta", "super", "win"}
 
         # Threads & grabs
         self._poll_thread = None
         self._key_listener = None
-        self._grabbed_keycodes = []
-
-        # Injection guard (suppresses listener during focus-sweep injection)
-        self._suppress_events = 0
+        self._grab_map = {}  # combo -> (keycode, mask) currently grabbed on the root
+        self._grab_watch = 0  # GLib io watch on self._d's fd (0 = none)
+        self._grab_drain_idle = 0  # idle source finishing a capped drain (0 = none)
+        self._move_watched = set()  # wins with StructureNotify selected on self._d
+        self._place_pending = 0     # GLib source id of a coalesced overlay placement
+
+        # Pending GLib source id of a coalesced _sync_overlays (0 = none)
+        self._sync_pending = 0
+        # Window activations run on their own thread, latest request wins
+        self._activations = queue.Queue()
+        threading.Thread(target=self._activation_worker, name="activate", daemon=True).start()
+        # prev/next presses not yet applied (summed; see _queue_switch)
+        self._switch_lock = threading.Lock()
+        self._switch_delta = 0
+        self._switch_scheduled = False
+        # Coalesced update_overlay_visibility: one idle callback at a time, and
+        # the inputs it last applied (None = overlays changed, must re-apply)
+        self._vis_update_pending = False
+        self._last_vis_state = None
+
+        # Injection guard: the listener swallows exactly the presses a focus
+        # sweep injects ((stable name, target wid) -> count), real presses still
+        # go through; the broadcaster holds the guard around each sweep on its
+        # worker thread. Only needed when pynput doesn't flag injected events
+        self._injected = {}
+        self._inject_lock = threading.Lock()
+        self._inject_depth = 0     # sweeps running
+        self._inject_stamp = 0.0   # monotonic time of the last expect / sweep end
+        self._listener_sees_injections = False  # pynput does, evdev doesn't
+        self._listener_flags_injections = False  # set once pynput passes injected=True
+        self.broadcaster.set_injection_guard(self.injection_guard)
 
     # ------------ injection guard ------------
     @contextmanager
     def injection_guard(self):
-        """Temporarily suppress key handling (used during focus-sweep injection)."""
-        self._suppress_events += 1
+        """Keep the expected injected presses live while a focus sweep runs."""
+        with self._inject_lock:
+            self._inject_depth += 1
         try:
             yield
         finally:
-            self._suppress_events = max(0, self._suppress_events - 1)
+            with self._inject_lock:
+                self._inject_depth -= 1
+                self._inject_stamp = time.monotonic()
+
+    def _expect_injected(self, name: str, wids):
+        """A focus sweep is about to inject `name` into each of `wids`: don't re-broadcast those."""
+        with self._inject_lock:
+            for wid in wids:
+                k = (name, str(wid))
+                self._injected[k] = self._injected.get(k, 0) + 1
+            self._inject_stamp = time.monotonic()
+
+    def _consume_injected(self, name: str) -> bool:
+        """
+        True if this press is one we injected (and count it off). The sweep
+        injects while its target has focus, so only a press landing in that
+        window counts: the same key pressed for real elsewhere still goes through.
+        """
+        if not self._injected:
+            return False
+        active = self.x11.get_active_window()  # fresh: the poller may lag behind the sweep
+        with self._inject_lock:
+            if not self._inject_depth and time.monotonic() - self._inject_stamp > _INJECT_GRACE:
+                # sweeps are done: whatever never showed up isn't coming
+                self._injected.clear()
+                return False
+            k = (name, active)
+            n = self._injected.get(k)
+            if not n:
+                return False
+            if n == 1:
+                del self._injected[k]
+            else:
+                self._injected[k] = n - 1
+            return True
 
     # ---------------- Windows & overlays ----------------
     def refresh_windows(self, pattern: str, custom_prefix: str = "WoW Window"):
-        wins1 = self.x11.rescan_windows(pattern.strip())
-        wins2 = self.x11.rescan_windows(custom_prefix)
+        pattern = pattern.strip()
+        if self._rescan_is_fresh(pattern, custom_prefix):
+            return self.wins[:]
+        started = time.monotonic()
+        wins = self._apply_scan(self._scan(pattern, custom_prefix), custom_prefix)
+        self._last_scan = (started, (pattern, custom_prefix))
+        return wins
+
+    def refresh_windows_async(self, pattern: str, custom_prefix: str, on_done):
+        """
+        refresh_windows with the wmctrl call on a worker thread, so the GUI doesn't
+        stall on it; the result is applied, and on_done(wins) called, on the GTK thread.
+        """
+        pattern = pattern.strip()
+        if self._rescan_is_fresh(pattern, custom_prefix):
+            on_done(self.wins[:])
+            return
 
-        all_wins = list(set(wins1 + wins2))
-        self.wins = sorted([w for w in all_wins if w])
+        def work():
+            started = time.monotonic()
+            try:
+                titles = self._scan(pattern, custom_prefix)
+            except Exception:
+                logger.exception("Rescan failed")
+                return
 
-        # Save original title (once), then retitle
-        wmap = self.x11.wmctrl_list()
-        for idx, w in enumerate(self.wins):
-            if w not in self.original_titles:
-                tup = wmap.get(str(w), ("", "", "", "", "", "", ""))
-                if tup:
-                    self.original_titles[w] = tup[-1]
-            new_title = f"{custom_prefix} {idx+1}"
-            self.x11.set_window_title(w, new_title)
+            def apply():
+                wins = self._apply_scan(titles, custom_prefix)
+                self._last_scan = (started, (pattern, custom_prefix))
+                on_done(wins)
+                return False
+            GLib.idle_add(apply, priority=GLib.PRIORITY_HIGH_IDLE)
+        threading.Thread(target=work, name="rescan", daemon=True).start()
 
+    def _rescan_is_fresh(self, pattern, custom_prefix) -> bool:
+        """
+        True if the same scan was applied within _RESCAN_REUSE (its result is still
+        current). _last_scan is only stamped once a scan succeeded, so a failed one
+        doesn't hold back the retry.
+        """
+        ts, last_args = self._last_scan
+        return last_args == (pattern, custom_prefix) and time.monotonic() - ts < _RESCAN_REUSE
+
+    def _scan(self, pattern, custom_prefix) -> dict:
+        """
+        win_id -> title of the matching windows, in wmctrl (client list) order.
+        One wmctrl pass gives ids and titles; match locally instead of one
+        xdotool search per pattern plus a wmctrl call for the titles.
+        Like `xdotool search --name`, the pattern is a case-insensitive regex.
+        Touches no controller state, so it may run off the GTK thread.
+        """
+        try:
+            rx = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            rx = re.compile(re.escape(pattern), re.IGNORECASE)
+        return {
+            w: t for w, t in self.x11.list_windows_with_titles()
+            if w and (rx.search(t) or t.startswith(custom_prefix))
+        }
+
+    def _apply_scan(self, titles, custom_prefix):
+        # keep wmctrl (client list) order: stable across rescans, so overlay indices don't churn
+        self.wins = list(titles)
+        self._wid_to_idx = {w: i for i, w in enumerate(self.wins)}
+        self.x11.save_window_list(self.wins)
+        logger.info("Rescanned windows: %s", self.wins)
+
+        # Save original title (once), then retitle
+        with self.x11.batched():
+            for idx, w in enumerate(self.wins):
+                if w not in self.original_titles and titles[w]:
+                    self.original_titles[w] = titles[w]  # untitled windows have nothing to restore
+                new_title = f"{custom_prefix} {idx+1}"
+                if titles[w] != new_title:
+                    self.x11.set_window_title(w, new_title)
+                    self._retitled.add(w)
+
+        self._watch_window_moves()
         self._sync_overlays()
         return self.wins[:]
 
     def _sync_overlays(self):
-        font_size = self.config.get("overlay_font_size", 36000)
-        color = self.config.get("overlay_color", "#00FF00")
-        show_broadcast = self.config.get("broadcast_enabled", False)
+        font_size = self._overlay_font_size
+        color = self._overlay_color
+        show_broadcast = self._broadcast_enabled
 
-        cur_ids = set(self.overlays.keys())
-        tgt_ids = set(self.wins)
-
-        for w in list(cur_ids - tgt_ids):
+        # _wid_to_idx already is the target set; no per-call set() copies
+        for w in [w for w in self.overlays if w not in self._wid_to_idx]:
             try:
-                self.overlays[w].destroy()
+                self.overlays.pop(w).destroy()
             except Exception:
                 pass
-            self.overlays.pop(w, None)
+            self._last_overlay_state.pop(w, None)
 
+        created = 0
         for idx, w in enumerate(self.wins):
-            if w not in self.overlays:
-                ov = self.Overlay(w, idx, color=color, font_size=font_size, show_broadcast=show_broadcast)
-                self.overlays[w] = ov
-            else:
-                self.overlays[w].update(index=idx, color=color, font_size=font_size, show_broadcast=show_broadcast)
+            state = (idx, color, font_size, show_broadcast)
+            ov = self.overlays.get(w)
+            if ov is None:
+                if created == _OVERLAYS_PER_SYNC:
+                    continue  # the rest after the main loop has had a turn
+                created += 1
+                ov = self.overlays[w] = self.Overlay(w, idx, color=color, font_size=font_size, show_broadcast=show_broadcast)
+            elif self._last_overlay_state.get(w) != state:
+                ov.update(index=idx, color=color, font_size=font_size, show_broadcast=show_broadcast)
+            self._last_overlay_state[w] = state
+        if len(self.overlays) < len(self.wins):
+            self._request_sync(0)
+        # no per-overlay placement here (X round trips each): only the active one
+        # is shown, and update_overlay_visibility places it
+
+        self._last_vis_state = None
+        self._request_vis_update()
+
+    def _request_sync(self, delay_ms: int = 50):
+        """Schedule one _sync_overlays; requests arriving before it runs are folded in."""
+        if not self._sync_pending:
+            self._sync_pending = GLib.timeout_add(delay_ms, self._do_sync_overlays)
+
+    def _do_sync_overlays(self):
+        self._sync_pending = 0
+        self._sync_overlays()
+        return False
 
-        for _, ov in self.overlays.items():
-            ov.place_on_window()
+    def _request_vis_update(self):
+        """Queue one update_overlay_visibility; requests made before it runs are folded in."""
+        if self._vis_update_pending:
+            return
+        self._vis_update_pending = True
+        GLib.idle_add(self._run_vis_update)
 
-        GLib.idle_add(self.update_overlay_visibility)
+    def _run_vis_update(self):
+        self._vis_update_pending = False
+        return self.update_overlay_visibility()
 
     def update_overlay_visibility(self):
-        if not self.config.get("overlay_enabled", True):
+        state = (self.active_window, self._overlay_enabled, self._broadcast_enabled,
+                 self._overlay_font_size, self._overlay_color)
+        if state == self._last_vis_state:
+            return False
+        self._last_vis_state = state
+
+        if not self._overlay_enabled:
             for ov in self.overlays.values():
                 ov.hide()
             return False
 
         active = self.active_window
-        if not active or active not in self.wins:
+        if not active or active not in self._wid_to_idx:
             for ov in self.overlays.values():
                 ov.hide()
         else:
-            is_broadcast = self.config.get("broadcast_enabled", False)
-            font_size = self.config.get("overlay_font_size", 36000)
-            color = self.config.get("overlay_color", "#00FF00")
+            is_broadcast = self._broadcast_enabled
+            font_size = self._overlay_font_size
+            color = self._overlay_color
 
             for wid, ov in self.overlays.items():
                 if wid == active:
@@ -143,111 +397,152 @@ class CoreController:
         if not self.wins:
             return "No captured windows"
 
-        if mode == "Maximize all":
-            for w in self.wins:
-                self.x11.maximize_window(w)
-
-        elif mode == "Tile horizontally":
-            n = len(self.wins)
-            if n == 0:
-                return "No windows"
-            h = max(10, scr_h // n)
-            y = 0
-            for w in self.wins:
-                self.x11.move_resize_window(w, 0, y, scr_w, h)
-                y += h
-
-        elif mode == "Main left + stack right":
-            main = self.wins[0]
-            others = self.wins[1:]
-            main_w = scr_w // 2
-            self.x11.move_resize_window(main, 0, 0, main_w, scr_h)
-            if others:
-                right_w = scr_w - main_w
-                h = max(10, scr_h // len(others))
-                y = 0
-                for w in others:
-                    self.x11.move_resize_window(w, main_w, y, right_w, h)
-                    y += h
-
-        else:  # "None" -> grid using given size
-            if size_w <= 0 or size_h <= 0:
-                return "Invalid size"
-            per_row = max(1, scr_w // size_w)
-            x = y = 0
-            cur = 0
-            for w in self.wins:
-                self.x11.move_resize_window(w, x, y, size_w, size_h)
-                cur += 1
-                x += size_w
-                if cur >= per_row:
-                    cur = 0
-                    x = 0
-                    y += size_h
-
-        GLib.timeout_add(300, self._sync_overlays)
+        with self.x11.batched():
+            if mode == "Maximize all":
+                for w in self.wins:
+                    self.x11.maximize_window(w)
+
+            elif mode == "Tile horizontally":
+                n = len(self.wins)
+                if n == 0:
+                    return "No windows"
+                h = max(10, scr_h // n)
+                for i, w in enumerate(self.wins):
+                    self.x11.move_resize_window(w, 0, i * h, scr_w, h)
+
+            elif mode == "Main left + stack right":
+                main = self.wins[0]
+                others = self.wins[1:]
+                main_w = scr_w // 2
+                self.x11.move_resize_window(main, 0, 0, main_w, scr_h)
+                if others:
+                    right_w = scr_w - main_w
+                    h = max(10, scr_h // len(others))
+                    for i, w in enumerate(others):
+                        self.x11.move_resize_window(w, main_w, i * h, right_w, h)
+
+            else:  # "None" -> grid using given size
+                if size_w <= 0 or size_h <= 0:
+                    return "Invalid size"
+                per_row = max(1, scr_w // size_w)
+                for i, w in enumerate(self.wins):
+                    row, col = divmod(i, per_row)
+                    self.x11.move_resize_window(w, col * size_w, row * size_h, size_w, size_h)
+
+        for w in self.wins:
+            self.Overlay.invalidate_geometry(w)
+        self._request_sync(300)
         return "Layout applied"
 
     def minimize_all(self):
-        for w in self.wins:
-            self.x11.minimize_window(w)
+        with self.x11.batched():
+            for w in self.wins:
+                self.x11.minimize_window(w)
 
     def close_all(self):
         for w in self.wins:
             self.x11.close_window(w)
-        GLib.timeout_add(700, self._after_close_all_refresh)
-
-    def _after_close_all_refresh(self):
-        return False
 
     def switch_next(self):
-        if not self.wins:
-            return
-        active = self.x11.get_active_window()
-        if active in self.wins:
-            i = (self.wins.index(active) + 1) % len(self.wins)
-        else:
-            i = 0
-        self.x11.activate_window(self.wins[i])
+        self._queue_switch(1)
 
     def switch_prev(self):
-        if not self.wins:
-            return
-        active = self.x11.get_active_window()
-        if active in self.wins:
-            i = (self.wins.index(active) - 1) % len(self.wins)
-        else:
-            i = 0
-        self.x11.activate_window(self.wins[i])
+        self._queue_switch(-1)
+
+    def _queue_switch(self, step: int):
+        """
+        prev/next presses landing before the main loop gets to them are summed,
+        so a burst of them costs one activate_window to the final target.
+        """
+        with self._switch_lock:
+            self._switch_delta += step
+            if self._switch_scheduled:
+                return
+            self._switch_scheduled = True
+        GLib.idle_add(self._flush_switch, priority=GLib.PRIORITY_HIGH_IDLE)  # ahead of redraw/overlay idles
+
+    def _flush_switch(self):
+        with self._switch_lock:
+            delta, self._switch_delta = self._switch_delta, 0
+            self._switch_scheduled = False
+        wins = self.wins
+        n = len(wins)
+        if not n or not delta:
+            return False
+        i = self._wid_to_idx.get(self.active_window)
+        if i is None:
+            i = -1 if delta > 0 else 1  # from outside the set, the first step lands on window 1
+        self._activate(wins[(i + delta) % n])
+        return False
+
+    def _activate(self, wid):
+        """
+        Queue x11_utils.activate_window(wid) for the activation thread (it sends
+        _NET_ACTIVE_WINDOW and polls until the WM complies, which blocks); skipped
+        when wid already has focus. Unlike xdotool windowactivate it doesn't switch
+        to the window's desktop first.
+        """
+        if wid != self.active_window:
+            self._activations.put(wid)
+
+    def _activation_worker(self):
+        while True:
+            wid = self._activations.get()
+            # only the newest request matters: drop any that queued up behind it
+            try:
+                while wid is not None:
+                    wid = self._activations.get_nowait()
+            except queue.Empty:
+                pass
+            if wid is None:
+                return
+            try:
+                self.x11.activate_window(wid)
+            except Exception:
+                logger.exception("activate %s failed", wid)
 
     def focus_index(self, idx: int):
-        if 0 <= idx < len(self.wins):
-            self.x11.activate_window(self.wins[idx])
+        wins = self.wins  # one snapshot: the listener thread calls this too
+        if 0 <= idx < len(wins):
+            self._activate(wins[idx])
 
     # ---------------- Config knobs used by GUI ----------------
     def set_broadcast_enabled(self, enabled: bool):
-        self.config["broadcast_enabled"] = bool(enabled)
+        self.config["broadcast_enabled"] = self._broadcast_enabled = bool(enabled)
         self.broadcaster.set_enabled(bool(enabled))
-        GLib.idle_add(self.update_overlay_visibility)
+        self._request_vis_update()
 
     def set_overlay_enabled(self, enabled: bool):
-        self.config["overlay_enabled"] = bool(enabled)
-        GLib.idle_add(self.update_overlay_visibility)
+        self.config["overlay_enabled"] = self._overlay_enabled = bool(enabled)
+        self._request_vis_update()
 
     def set_overlay_color(self, hex_color: str):
-        self.config["overlay_color"] = hex_color
-        self._sync_overlays()
+        self.config["overlay_color"] = self._overlay_color = hex_color
+        self._request_sync()
 
     def set_overlay_font_size(self, pts: int):
-        self.config["overlay_font_size"] = int(pts)
-        self._sync_overlays()
+        self.config["overlay_font_size"] = self._overlay_font_size = int(pts)
+        self._request_sync()
 
     def set_inhibit_keys(self, keys_iterable):
         self.config["inhibit_keys"] = [s.strip() for s in keys_iterable if s.strip()]
-        self.inhibit_keys = set(k.lower() for k in self.config["inhibit_keys"])
+        self.inhibit_keys = frozenset(k.lower() for k in self.config["inhibit_keys"])
+        self._inhibit_combos = frozenset(filter(None, map(strict_shortcut_tuple, self.inhibit_keys)))
 
     def reparse_shortcuts(self):
         self.shortcut_handler = ShortcutHandler(self.config)
+        self._parse_shortcut_grabs()
+        if self.running:
+            self._try_grab_shortcuts()
+
+    def update_shortcut(self, action_key: str):
+        """One action's binding changed in config["shortcuts"]: rebind just that one."""
+        spec = self.config.get("shortcuts", {}).get(action_key, "")
+        if not self.shortcut_handler.update_action(action_key, spec):
+            return
+        self._parse_shortcut_grabs()
+        if self.running:
+            self._try_grab_shortcuts()
 
     # ---------------- Focus/keys listener ----------------
     def start(self):
@@ -257,61 +552,147 @@ class CoreController:
         self._start_focus_poller()
         self._start_key_listener()
         self._try_grab_shortcuts()  # best-effort
+        self._watch_grab_display()
 
     def stop(self):
         self.running = False
+        self._activations.put(None)
+        try:
+            self.broadcaster.stop()
+        except Exception:
+            _log_cleanup_error("Stopping broadcaster")
         try:
             if self._key_listener:
                 self._key_listener.stop()
         except Exception:
-            logger.exception("Stopping key listener")
+            _log_cleanup_error("Stopping key listener")
         try:
+            self._unwatch_grab_display()
             self._ungrab_shortcuts()
         except Exception:
-            logger.exception("Ungrab shortcuts")
+            _log_cleanup_error("Ungrab shortcuts")
         # restore titles / destroy overlays
-        for wid, original in self.original_titles.items():
-            if original:
-                try: self.x11.set_window_title(wid, original)
-                except Exception: pass
-        for ov in list(self.overlays.values()):
+        # one batch (single X sync) for all restores; failures are logged once
+        failed = self.x11.set_window_titles(
+            (wid, original) for wid, original in self.original_titles.items() if wid in self._retitled
+        )
+        if failed:
+            logger.warning("Could not restore titles of %s", failed)
+        overlays, self.overlays = self.overlays, {}
+        for ov in overlays.values():
             try: ov.destroy()
             except Exception: pass
-        self.overlays.clear()
         try:
-            self._d.flush(); self._d.close()
+            self._d.close()  # close() flushes the queued ungrab first
         except Exception:
             pass
 
     def _start_focus_poller(self):
-        def run():
+        def set_active(cur):
+            self.active_window = cur
+            self._request_vis_update()
+
+        def poll():
+            # fallback for WMs that don't publish _NET_ACTIVE_WINDOW:
+            # poll fast right after a focus change, back off while idle
             last = None
+            delay = 0.02
+            while self.running:
+                cur = self.x11.get_active_window()
+                if cur != last:
+                    last = cur
+                    set_active(cur)
+                    delay = 0.02
+                else:
+                    delay = min(delay * 1.5, 0.2)
+                time.sleep(delay)
+
+        def run():
+            # own connection: next_event() must not race the grab calls on self._d
+            d = display.Display()
             try:
+                root = d.screen().root
+                net_active = d.intern_atom("_NET_ACTIVE_WINDOW")
+
+                def read_active():
+                    prop = root.get_full_property(net_active, X.AnyPropertyType)
+                    if prop is None:
+                        return None
+                    wid = prop.value[0] if len(prop.value) else 0
+                    return str(wid) if wid else ""
+
+                last = read_active()
+                if last is None:
+                    poll()
+                    return
+                set_active(last)
+                last_time = None  # server timestamp (ms) of the newest change seen
+                dirty = False
+
+                # PropertyNotify on the root fires whenever the WM changes _NET_ACTIVE_WINDOW
+                root.change_attributes(event_mask=X.PropertyChangeMask)
+                d.flush()
                 while self.running:
-                    cur = self.x11.get_active_window()
+                    if not _has_events(d):
+                        # short timeout so stop() is noticed promptly
+                        ready, _, _ = select.select([d.fileno()], [], [], 0.2)
+                        if not ready:
+                            continue
+                    ev = d.next_event()
+                    if ev.type == X.PropertyNotify and ev.atom == net_active:
+                        # order by server time (32-bit ms, wraps): skip stale notifies
+                        if last_time is None or not (ev.time - last_time) & 0x80000000:
+                            last_time = ev.time
+                            dirty = True
+                    # re-read once per burst, after the queue is drained
+                    if not dirty or _has_events(d):
+                        continue
+                    dirty = False
+                    cur = read_active() or ""
                     if cur != last:
                         last = cur
-                        self.active_window = cur
-                        GLib.idle_add(self.update_overlay_visibility)
-                    time.sleep(0.05)
+                        set_active(cur)
             except Exception:
                 logger.exception("focus poller crashed")
+            finally:
+                try: d.close()
+                except Exception: pass
         self._poll_thread = threading.Thread(target=run, daemon=True)
         self._poll_thread.start()
 
     def _start_key_listener(self):
-        def on_press(key):
+        # Log level snapshot for the listener's lifetime: keeps debug argument
+        # formatting off the per-key path (restart the listener to pick up changes)
+        dbg = logger.isEnabledFor(logging.DEBUG)
+
+        # pynput >= 1.8 passes injected= to callbacks that take it; older ones don't
+        def on_press(key, injected=False):
             if not self.running:
                 return False
 
-            # Ignore anything we ourselves inject during focus-sweep
-            if self._suppress_events:
-                return True
+            self._set_modifier(key, True)
+            # any press ends the release -> press adjacency the repeat check needs
+            rel_key, rel_ts = self._last_release
+            self._last_release = (None, 0.0)
 
             # Decode first to get a STABLE name
             key_name, alt, ctrl, shift = self._decode_key_precise(key)
             stable_name = self._stable_name_for_sets(key_name)
 
+            # Ignore the keys we ourselves inject during focus-sweep
+            if injected:
+                self._listener_flags_injections = True  # no need to count them from now on
+                return True
+            if self._consume_injected(stable_name):
+                return True
+
+            # X auto-repeat sends a synthetic release right before each repeated
+            # press, which would defeat the pressed_names guard below: drop the pair
+            if key == rel_key and time.monotonic() - rel_ts < _AUTOREPEAT_GAP:
+                return True
+
+            pressed = self.pressed_names
+
             # ----- HARD FILTER: ignore pure modifier presses -----
             is_modifier = key_name in self._mod_names
             if is_modifier:
@@ -320,27 +701,27 @@ class CoreController:
                 return True
 
             # Edge-trigger: only act on first physical press (kills auto-repeat)
-            if stable_name in self.pressed_names:
+            if stable_name in pressed:
                 return True  # swallow repeats
 
             # Now track sets for the first time
             self._track_press_sets(key, stable_name)
 
             # Only react when focus is one of our target windows
-            active = self.x11.get_active_window()
-            if active not in self.wins:
+            # (kept fresh by the focus poller; no X round-trip per key)
+            # one snapshot per key: refresh_windows may rebind self.wins meanwhile
+            active, wins = self.active_window, self.wins
+            if active not in self._wid_to_idx:  # O(1), unlike the list
                 return True
 
-            combo_now = normalize_shortcut("+".join(
-                (["alt"] if alt else []) +
-                (["control"] if ctrl else []) +
-                (["shift"] if shift else []) +
-                [key_name]
-            ))
-            logger.debug("DECODE: key=%r combo=%r alt=%s ctrl=%s shift=%s", key_name, combo_now, alt, ctrl, shift)
+            mod_mask = (MOD_ALT if alt else 0) | (MOD_CONTROL if ctrl else 0) | (MOD_SHIFT if shift else 0)
+            if dbg:
+                # same canonical form as normalize_shortcut (alt, control, shift, key)
+                combo_now = f"{'alt+' if alt else ''}{'control+' if ctrl else ''}{'shift+' if shift else ''}{key_name}"
+                logger.debug("DECODE: key=%r combo=%r alt=%s ctrl=%s shift=%s", key_name, combo_now, alt, ctrl, shift)
 
             # App shortcuts (actions or focus N)
-            matched = self.shortcut_handler.match(combo_now)
+            matched = self.shortcut_handler.match_tuple(mod_mask, key_name)
             if matched:
                 kind, payload = matched
                 if kind == "action":
@@ -349,82 +730,75 @@ class CoreController:
                     self.focus_index(payload)
                 return True
 
-            if not self.config.get("broadcast_enabled", False):
+            if not self._broadcast_enabled:
                 return True
-            if key_name in self.inhibit_keys or combo_now in self.inhibit_keys:
+            if key_name in self.inhibit_keys or (mod_mask, key_name) in self._inhibit_combos:
                 return True
 
             # Printable literal without modifiers -> send_literal
-            if not (alt or ctrl or shift) and self._is_printable_char(key_name):
+            if not mod_mask and self._is_printable_char(key_name):
                 ch = self._normalize_printable_char(key_name)
-                logger.debug("TX: literal -> %r", ch)
-                self._log_targets("TYPE", ch, active)
-                if self.broadcaster.is_focus_sweep():
-                    with self.injection_guard():
-                        self.broadcaster.send_literal(ch, self.wins, exclude=active)
-                else:
-                    self.broadcaster.send_literal(ch, self.wins, exclude=active)
+                if dbg:
+                    logger.debug("TX: literal -> %r", ch)
+                targets = self._targets_for(active, wins)
+                self._expect_sweep(stable_name, targets)
+                self.broadcaster.send_literal(ch, targets)
                 return True
 
             # Otherwise use key sequence
-            send_key = self._map_key_for_xdotool(key_name)
+            send_key = _KEYNAME_MAP.get(key_name, key_name)
             seq_parts = []
             if alt: seq_parts.append("alt")
             if ctrl: seq_parts.append("ctrl")
             if shift: seq_parts.append("shift")
             seq = "+".join(seq_parts + [send_key]) if seq_parts else send_key
-            logger.debug("TX: keyseq -> %r", seq)
-            self._log_targets("KEY", seq, active)
-            if self.broadcaster.is_focus_sweep():
-                with self.injection_guard():
-                    self.broadcaster.send_key(seq, self.wins, exclude=active)
-            else:
-                self.broadcaster.send_key(seq, self.wins, exclude=active)
+            if dbg:
+                logger.debug("TX: keyseq -> %r", seq)
+            targets = self._targets_for(active, wins)
+            self._expect_sweep(stable_name, targets)
+            self.broadcaster.send_key(seq, targets)
             return True
 
-        def on_release(key):
+        def on_release(key, injected=False):
             # Decode a stable name for reliable cleanup
             stable = None
             if isinstance(key, KeyCode) and key.char:
                 stable = self._stable_name_for_sets(key.char.lower())
             else:
-                special_map = {
-                    Key.enter: "enter", Key.space: "space", Key.tab: "tab",
-                    Key.backspace: "backspace", Key.esc: "escape",
-                    Key.up: "up", Key.down: "down", Key.left: "left", Key.right: "right",
-                    Key.home: "home", Key.end: "end", Key.page_up: "page_up", Key.page_down: "page_down",
-                    Key.delete: "delete", Key.insert: "insert",
-                    Key.shift: "shift", Key.shift_l: "shift", Key.shift_r: "shift",
-                    Key.ctrl: "control", Key.ctrl_l: "control", Key.ctrl_r: "control",
-                    Key.alt: "alt", Key.alt_l: "alt", Key.alt_r: "alt",
-                }
-                if key in special_map:
-                    stable = special_map[key]
-                else:
-                    s = str(key).replace("Key.", "").lower()
-                    stable = self._stable_name_for_sets(s)
+                stable = _KEY_NAMES.get(key)
+                if stable is None:
+                    stable = self._stable_name_for_sets(_key_name(key))
 
-            # Clean both tracking sets
-            if stable in self.pressed_names:
-                self.pressed_names.remove(stable)
-            try:
-                if key in self.current_keys:
-                    self.current_keys.remove(key)
-                else:
-                    s = str(key)
-                    for k in list(self.current_keys):
-                        if str(k) == s:
-                            self.current_keys.remove(k)
-            except Exception:
-                pass
+            self._last_release = (key, time.monotonic())
+
+            # Clean tracking state
+            self.pressed_names.discard(stable)
+            self._set_modifier(key, False)
             return True
 
-        self._key_listener = keyboard.Listener(
-            on_press=on_press, on_release=on_release, suppress=False
-        )
+        # evdev ("input_backend": "evdev") reads /dev/input directly (no X round
+        # trip, repeats flagged by the kernel) but maps keys with a US layout;
+        # pynput follows the X keymap and is the default, and the fallback when
+        # evdev is unavailable or unreadable
+        listener = None
+        if self.config.get("input_backend", "pynput") != "pynput":
+            listener = EvdevListener.open(on_press, on_release)
+        # evdev never sees XTEST injections and skips our uinput device
+        self._listener_sees_injections = listener is None
+        if listener is None:
+            listener = keyboard.Listener(
+                on_press=on_press, on_release=on_release, suppress=False
+            )
+        self._key_listener = listener
         self._key_listener.start()
 
 
+    def _expect_sweep(self, stable_name: str, targets):
+        """Register the presses a focus sweep will inject, if the listener can't tell them apart."""
+        if (self._listener_sees_injections and not self._listener_flags_injections
+                and self.broadcaster.is_focus_sweep()):
+            self._expect_injected(stable_name, targets)
+
     # ---------- helpers for key mapping & logging ----------
     def _stable_name_for_sets(self, key_name: str) -> str:
         """
@@ -439,27 +813,13 @@ class CoreController:
         return key_name  # already canonical from _decode_key_precise
 
     def _is_printable_char(self, key_name: str) -> bool:
-        if not key_name or len(key_name) != 1:
-            return False
-        return key_name in string.printable and key_name not in ("\t", "\n", "\r", "\x0b", "\x0c")
+        return len(key_name) == 1 and ord(key_name) in _PRINTABLE_ORDS
 
     def _normalize_printable_char(self, key_name: str) -> str:
         return key_name
 
-    def _map_key_for_xdotool(self, key_name: str) -> str:
-        k = key_name
-        if k == "enter": return "Return"
-        if k == "space": return "space"
-        if k == "tab": return "Tab"
-        if k == "backspace": return "BackSpace"
-        if k.startswith("f") and k[1:].isdigit(): return k.upper()
-        return k
-
     def _decode_key_precise(self, key):
-        keys = self.current_keys
-        alt = any(k in keys for k in (Key.alt, Key.alt_l, Key.alt_r))
-        ctrl = any(k in keys for k in (Key.ctrl, Key.ctrl_l, Key.ctrl_r))
-        shift = any(k in keys for k in (Key.shift, Key.shift_l, Key.shift_r))
+        alt, ctrl, shift = self._mod_alt, self._mod_ctrl, self._mod_shift
 
         if isinstance(key, KeyCode) and key.char:
             name = key.char.lower()
@@ -467,62 +827,137 @@ class CoreController:
                 name = " "
             return name, alt, ctrl, shift
 
-        special_map = {
-            Key.enter: "enter", Key.space: "space", Key.tab: "tab",
-            Key.backspace: "backspace", Key.esc: "escape",
-            Key.up: "up", Key.down: "down", Key.left: "left", Key.right: "right",
-            Key.home: "home", Key.end: "end", Key.page_up: "page_up", Key.page_down: "page_down",
-            Key.delete: "delete", Key.insert: "insert",
-        }
-        if key in special_map:
-            return special_map[key], alt, ctrl, shift
-
-        for i, fk in enumerate((Key.f1, Key.f2, Key.f3, Key.f4, Key.f5, Key.f6,
-                                Key.f7, Key.f8, Key.f9, Key.f10, Key.f11, Key.f12), start=1):
-            if key == fk:
-                return f"f{i}", alt, ctrl, shift
-
-        name = str(key).replace("Key.", "").lower()
+        name = _KEY_NAMES.get(key)
+        if name is None:
+            name = _key_name(key)
         return name, alt, ctrl, shift
 
-    def _log_targets(self, mode: str, payload: str, exclude_active):
-        try:
-            wmap = self.x11.wmctrl_list()
-        except Exception:
-            wmap = {}
-        for wid in self.wins:
-            if exclude_active and wid == exclude_active:
-                continue
-            title = wmap.get(str(wid), ("", "", "", "", "", "", ""))[-1] if wmap else ""
-            logger.debug("SEND %s -> win=%s title=%r payload=%r", mode, wid, title, payload)
-    
+    def _targets_for(self, active, wins) -> tuple:
+        """Broadcast targets (wins minus the active one), rebuilt only when either changes."""
+        (c_active, c_wins), targets = self._targets
+        if c_active != active or c_wins is not wins:
+            targets = tuple(w for w in wins if w != active)
+            self._targets = ((active, wins), targets)
+        return targets
+
     def _track_press_sets(self, key, stable_name: str):
-        """Record a press in both tracking sets (object + stable name)."""
-        try:
-            self.current_keys.add(key)
-        except Exception:
-            pass
+        """Record a press by stable name (auto-repeat suppression)."""
         if stable_name:
             self.pressed_names.add(stable_name)
 
+    def _set_modifier(self, key, down: bool):
+        """Keep the alt/ctrl/shift flags in sync with modifier presses/releases."""
+        if key in _ALT_KEYS:
+            self._mod_alt = down
+        elif key in _CTRL_KEYS:
+            self._mod_ctrl = down
+        elif key in _SHIFT_KEYS:
+            self._mod_shift = down
+
     # ---------------- shortcut grabbing ----------------
+    def _parse_shortcut_grabs(self):
+        """Resolve every combo to its (keycode, mask) once, when shortcuts are (re)parsed."""
+        parsed = {}
+        for combo in self.shortcut_handler.all_shortcut_combos():
+            parts = combo.split("+")
+            keysym = _keysym_for(parts[-1])
+            if not keysym:
+                continue
+            keycode = self._d.keysym_to_keycode(keysym)
+            if not keycode:
+                continue
+            parsed[combo] = (keycode, self._modifiers_to_mask(parts[:-1]))
+        self._parsed_shortcuts = parsed
+
+    def _watch_grab_display(self):
+        """Drain self._d from the GLib loop whenever its fd turns readable (no polling)."""
+        if not self._grab_watch:
+            channel = GLib.IOChannel.unix_new(self._d.fileno())
+            self._grab_watch = GLib.io_add_watch(channel, GLib.PRIORITY_DEFAULT, GLib.IO_IN,
+                                                 self._drain_grab_display)
+
+    def _unwatch_grab_display(self):
+        if self._grab_watch:
+            GLib.source_remove(self._grab_watch)
+            self._grab_watch = 0
+
+    def _drain_grab_display(self, *_):
+        """
+        Grabbed key events are only swallowed here (the key listener dispatches
+        them), but they must be read or they pile up in Xlib's queue. A keyboard
+        MappingNotify re-resolves the shortcut keycodes and regrabs.
+        """
+        d = self._d
+        try:
+            for _ in range(_MAX_EVENTS_PER_TICK):
+                if not _has_events(d):
+                    break
+                ev = d.next_event()
+                if ev.type == X.ConfigureNotify:
+                    # a tracked window moved/resized: follow it if its overlay is up
+                    wid = str(ev.window.id)
+                    self.Overlay.invalidate_geometry(wid)
+                    if wid == self.active_window:
+                        self._request_place()
+                elif ev.type == X.MappingNotify and ev.request == X.MappingKeyboard:
+                    d.refresh_keyboard_mapping(ev)
+                    self._parse_shortcut_grabs()
+                    if self.running:
+                        self._try_grab_shortcuts()
+            else:
+                # cap hit: let other GLib sources run, finish on an idle callback
+                # (the rest may already sit in Xlib's queue, so the fd won't fire)
+                if not self._grab_drain_idle:
+                    self._grab_drain_idle = GLib.idle_add(self._drain_grab_display_rest)
+        except Exception:
+            logger.exception("grab display event handling failed")
+        return True
+
+    def _watch_window_moves(self):
+        """Select StructureNotify on tracked windows (on self._d) to get their ConfigureNotify."""
+        for w in self.wins:
+            if w in self._move_watched:
+                continue
+            try:
+                self._d.create_resource_object("window", int(w)).change_attributes(
+                    event_mask=X.StructureNotifyMask)
+            except Exception:
+                logger.exception("watch moves of %s", w)
+        self._move_watched = set(self.wins)
+        self._d.flush()
+
+    def _request_place(self, delay_ms: int = 30):
+        """Re-place the active overlay once, however many ConfigureNotify a drag produces."""
+        if not self._place_pending:
+            self._place_pending = GLib.timeout_add(delay_ms, self._place_active_overlay)
+
+    def _place_active_overlay(self):
+        self._place_pending = 0
+        ov = self.overlays.get(self.active_window)
+        if ov is not None and self._overlay_enabled:
+            ov.place_on_window()
+        return False
+
+    def _drain_grab_display_rest(self):
+        self._grab_drain_idle = 0
+        self._drain_grab_display()
+        return False
+
     def _try_grab_shortcuts(self):
+        """Grab new combos and release stale ones; unchanged bindings aren't touched."""
         try:
-            self._grabbed_keycodes = []
-            for combo in self.shortcut_handler.all_shortcut_combos():
-                parts = combo.split("+")
-                keyname = parts[-1]
-                modifiers = parts[:-1]
-                mask = self._modifiers_to_mask(modifiers)
-                keysym = XK.string_to_keysym(keyname) or XK.string_to_keysym("Key_" + keyname)
-                if not keysym:
-                    continue
-                keycode = self._d.keysym_to_keycode(keysym)
-                if not keycode:
-                    continue
+            wanted = self._parsed_shortcuts
+            for combo in [c for c, kc_mask in self._grab_map.items() if wanted.get(c) != kc_mask]:
+                keycode, mask = self._grab_map.pop(combo)
+                try:
+                    self._root.ungrab_key(keycode, mask)
+                except Exception:
+                    pass
+            for combo in wanted.keys() - self._grab_map.keys():
+                keycode, mask = wanted[combo]
                 try:
                     self._root.grab_key(keycode, mask, True, X.GrabModeAsync, X.GrabModeAsync)
-                    self._grabbed_keycodes.append((keycode, mask))
+                    self._grab_map[combo] = (keycode, mask)
                 except Exception:
                     pass
             self._d.flush()
@@ -530,33 +965,31 @@ class CoreController:
             logger.exception("grab shortcuts failed")
 
     def _ungrab_shortcuts(self):
-        try:
-            for keycode, mask in list(self._grabbed_keycodes):
-                try:
-                    self._root.ungrab_key(keycode, mask)
-                except Exception:
-                    pass
-            self._d.flush()
-        except Exception:
-            pass
-        self._grabbed_keycodes = []
+        """Teardown: drop every grab at once (UngrabKey only affects this client's grabs)."""
+        if self._grab_map:
+            try:
+                self._root.ungrab_key(X.AnyKey, X.AnyModifier)
+                self._d.flush()
+            except Exception:
+                pass
+        self._grab_map = {}
 
     def _modifiers_to_mask(self, modifiers):
-        modmap = {
-            "shift": X.ShiftMask, "control": X.ControlMask, "ctrl": X.ControlMask,
-            "alt": X.Mod1Mask, "mod1": X.Mod1Mask, "mod4": X.Mod4Mask,
-            "super": X.Mod4Mask, "win": X.Mod4Mask, "meta": X.Mod4Mask,
-        }
-        mask = 0
-        for m in modifiers:
-            mask |= modmap.get(m, 0)
-        return mask
+        return functools.reduce(operator.or_, (_MODMAP.get(m, 0) for m in modifiers), 0)
 
     # ---------------- Execute shortcut actions ----------------
+    @staticmethod
+    def _once(fn):
+        """idle_add callback: run fn once on the GTK thread."""
+        fn()
+        return False
+
     def _exec_action(self, action_name: str):
         if action_name == "prev": self.switch_prev()
         elif action_name == "next": self.switch_next()
-        elif action_name == "minimize_all": self.minimize_all()
-        elif action_name == "close_all": self.close_all()
-        elif action_name == "toggle_broadcast": self.set_broadcast_enabled(not self.config.get("broadcast_enabled", False))
-        elif action_name == "toggle_overlay": self.set_overlay_enabled(not self.config.get("overlay_enabled", True))
+        # the listener thread calls this: window actions go over the shared
+        # display connection, which only the GTK thread may use
+        elif action_name == "minimize_all": GLib.idle_add(self._once, self.minimize_all)
+        elif action_name == "close_all": GLib.idle_add(self._once, self.close_all)
+        elif action_name == "toggle_broadcast": self.set_broadcast_enabled(not self._broadcast_enabled)
+        elif action_name == "toggle_overlay": self.set_overlay_enabled(not self._overlay_enabled)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# evdev_listener.py — read the keyboards straight from /dev/input (python-evdev),
+# a drop-in for pynput's keyboard.Listener that skips the X server round trip.
+# Events are handed to the same on_press/on_release callbacks as pynput Key/KeyCode
+# objects. Codes are physical keys, mapped with a US layout (like the uinput backend),
+# so this is opt-in (config "input_backend": "evdev"); pynput follows the X keymap.
+
+import select
+import threading
+import time
+import logging
+
+from pynput.keyboard import Key, KeyCode
+
+logger = logging.getLogger(__name__)
+
+# the uinput broadcaster's virtual keyboard: never listen to our own injections
+_OWN_DEVICE = "multiboxer-keyboard"
+
+# how often /dev/input is rescanned for keyboards plugged in after start
+_HOTPLUG_RESCAN = 2.0  # seconds
+
+# evdev KEY_* name (without prefix) -> pynput Key attribute, where not a character
+_SPECIAL = {
+    "ENTER": "enter", "KPENTER": "enter", "SPACE": "space", "TAB": "tab",
+    "BACKSPACE": "backspace", "ESC": "esc", "DELETE": "delete", "INSERT": "insert",
+    "UP": "up", "DOWN": "down", "LEFT": "left", "RIGHT": "right",
+    "HOME": "home", "END": "end", "PAGEUP": "page_up", "PAGEDOWN": "page_down",
+    "LEFTSHIFT": "shift_l", "RIGHTSHIFT": "shift_r",
+    "LEFTCTRL": "ctrl_l", "RIGHTCTRL": "ctrl_r",
+    "LEFTALT": "alt_l", "RIGHTALT": "alt_r",
+    "LEFTMETA": "cmd_l", "RIGHTMETA": "cmd_r",
+    "CAPSLOCK": "caps_lock", "NUMLOCK": "num_lock", "SCROLLLOCK": "scroll_lock",
+    "COMPOSE": "menu", "PAUSE": "pause", "SYSRQ": "print_screen",
+    **{f"F{i}": f"f{i}" for i in range(1, 21)},
+}
+
+# evdev KEY_* name -> character (unshifted)
+_CHARS = {
+    **{c: c.lower() for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"},
+    "MINUS": "-", "EQUAL": "=", "LEFTBRACE": "[", "RIGHTBRACE": "]",
+    "SEMICOLON": ";", "APOSTROPHE": "'", "GRAVE": "`", "BACKSLASH": "\\",
+    "COMMA": ",", "DOT": ".", "SLASH": "/",
+}
+
+
+def _build_keymap(ecodes):
+    """evdev key code -> pynput Key/KeyCode, built once."""
+    keymap = {}
+    for name, code in ecodes.ecodes.items():
+        if not name.startswith("KEY_"):
+            continue
+        short = name[4:]
+        attr = _SPECIAL.get(short)
+        if attr is not None:
+            if hasattr(Key, attr):
+                keymap[code] = getattr(Key, attr)
+        elif short in _CHARS:
+            keymap[code] = KeyCode.from_char(_CHARS[short])
+    return keymap
+
+
+def _open_keyboards(evdev, ecodes, paths):
+    """Open the readable keyboards among paths (not our own uinput device)."""
+    devices = []
+    for path in paths:
+        try:
+            dev = evdev.InputDevice(path)
+        except OSError:
+            continue  # no permission on this node
+        keys = dev.capabilities().get(ecodes.EV_KEY, [])
+        if dev.name != _OWN_DEVICE and ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys:
+            devices.append(dev)
+        else:
+            dev.close()
+    return devices
+
+
+class EvdevListener:
+    """
+    Same surface as pynput.keyboard.Listener (start/stop, callbacks returning False
+    stop it). Key repeats (value 2) are dropped here, so callbacks only see real
+    presses and releases. Use open(), which returns None when evdev or a readable
+    keyboard isn't available, so the caller can fall back to pynput.
+    """
+
+    def __init__(self, devices, evdev, ecodes, on_press, on_release):
+        self._devices = devices
+        self._evdev = evdev
+        self._ecodes = ecodes
+        self._ev_key = ecodes.EV_KEY
+        self._keymap = _build_keymap(ecodes)
+        self._on_press = on_press
+        self._on_release = on_release
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def open(cls, on_press, on_release):
+        try:
+            import evdev
+            from evdev import ecodes
+        except ImportError:
+            return None
+        devices = _open_keyboards(evdev, ecodes, evdev.list_devices())
+        if not devices:
+            return None
+        logger.info("evdev listener on: %s", ", ".join(d.path for d in devices))
+        return cls(devices, evdev, ecodes, on_press, on_release)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="evdev-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        ep = select.epoll()
+        by_fd = {}
+
+        def add(dev):
+            ep.register(dev.fd, select.EPOLLIN)
+            by_fd[dev.fd] = dev
+
+        def drop(dev):
+            logger.info("evdev keyboard gone: %s", dev.path)
+            by_fd.pop(dev.fd, None)
+            try: ep.unregister(dev.fd)
+            except (OSError, ValueError): pass
+            try: dev.close()
+            except Exception: pass
+
+        try:
+            for dev in self._devices:
+                add(dev)
+            next_scan = time.monotonic() + _HOTPLUG_RESCAN
+            while self._running:
+                # short timeout so stop() is noticed promptly
+                for fd, _ in ep.poll(0.2):
+                    dev = by_fd.get(fd)
+                    if dev is None:
+                        continue
+                    ok = self._dispatch(dev)
+                    if ok is None:
+                        drop(dev)
+                    elif not ok:
+                        self._running = False
+                        break
+                now = time.monotonic()
+                if now >= next_scan:
+                    next_scan = now + _HOTPLUG_RESCAN
+                    known = {d.path for d in by_fd.values()}
+                    new = [p for p in self._evdev.list_devices() if p not in known]
+                    for dev in _open_keyboards(self._evdev, self._ecodes, new):
+                        logger.info("evdev keyboard added: %s", dev.path)
+                        add(dev)
+        except Exception:
+            logger.exception("evdev listener crashed")
+        finally:
+            ep.close()
+            for dev in by_fd.values():
+                try: dev.close()
+                except Exception: pass
+
+    def _dispatch(self, dev):
+        """
+        Feed one device's pending events to the callbacks; False = stop listening,
+        None = the device went away (unplugged: ENODEV and friends).
+        """
+        try:
+            events = list(dev.read())
+        except BlockingIOError:
+            return True
+        except OSError:
+            return None
+        for ev in events:
+            if ev.type != self._ev_key or ev.value == 2:
+                continue
+            key = self._keymap.get(ev.code)
+            if key is None:
+                continue
+            cb = self._on_press if ev.value == 1 else self._on_release
+            if cb(key) is False:
+                return False
+        return True
@@ -9,13 +9,33 @@ import logging
 # GTK
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, GLib, Gio
+
+
+def _refuse_wayland():
+    if os.environ.get("XDG_SESSION_TYPE") == "wayland":
+        dialog = Gtk.MessageDialog(
+            transient_for=None,
+            flags=0,
+            message_type=Gtk.MessageType.ERROR,
+            buttons=Gtk.ButtonsType.OK,
+            text="Wayland not supported",
+        )
+        dialog.format_secondary_text("This application requires X11.")
+        dialog.run()
+        dialog.destroy()
+        sys.exit(1)
+
+
+# Fail fast, before the X11-only modules below (Xlib, pynput, evdev) are loaded
+if __name__ == "__main__":
+    _refuse_wayland()
 
 # Project modules
 import config
 import x11_utils
 from overlay import Overlay
-from broadcaster import Broadcaster
+from broadcaster import Broadcaster, UInputBroadcaster
 from core import CoreController
 
 # Logging
@@ -26,6 +46,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MultiboxerGUI")
 
+# Shortcut entries in the UI, two per row: (config key, label)
+_SHORTCUT_FIELDS = (
+    ("prev", "Prev:"), ("next", "Next:"),
+    ("minimize_all", "Minimize all:"), ("close_all", "Close all:"),
+    ("toggle_overlay", "Toggle overlay:"), ("toggle_broadcast", "Toggle broadcast:"),
+)
+
+# Settings changed from the UI are written to disk at most this often
+_CONFIG_SAVE_DELAY_MS = 500
+# Text entries (shortcuts, inhibit keys) are applied once typing pauses this long
+_ENTRY_COMMIT_DELAY_MS = 300
+# Log viewer: show at most the last 512 KiB, inserted 64 Ki characters per idle callback
+_LOG_TAIL_BYTES = 512 * 1024
+_LOG_INSERT_CHUNK = 64 * 1024
+
 
 def handle_sigint(signum, frame):
     Gtk.main_quit()
@@ -38,18 +73,34 @@ class MultiboxerApp(Gtk.Window):
     def __init__(self):
         super().__init__(title="Multiboxer Control Center")
         self.set_default_size(720, 520)
+        self._destroyed = False
         self.connect("destroy", self.on_destroy)
 
         # Load config and build core
         self.cfg = config.load_config()
-        self.broadcaster = Broadcaster(
+        mode = self.cfg.get("broadcast_mode", "focus_sweep")
+        BroadcasterClass = UInputBroadcaster if mode == "uinput" else Broadcaster
+        self.broadcaster = BroadcasterClass(
             x11_utils,
             enabled=self.cfg.get("broadcast_enabled", False),
-            mode=self.cfg.get("broadcast_mode", "focus_sweep")  # default to focus_sweep
+            mode=mode  # default to focus_sweep
         )
         self.core = CoreController(self.cfg, x11_utils, Overlay, self.broadcaster)
 
+        # Screen size, refreshed only when the screen is reconfigured
+        screen = Gdk.Screen.get_default()
+        self._on_screen_size_changed(screen)
+        screen.connect("size-changed", self._on_screen_size_changed)
+        screen.connect("monitors-changed", self._on_screen_size_changed)
+
         # UI
+        self._rescan_pending = False
+        self._config_save_pending = 0  # GLib source id of the delayed config write
+        self._entry_commit_pending = 0  # ... and of the debounced text-entry commit
+        self._entries_dirty = set()
+        self._log_fill_pending = 0  # idle source still inserting log text into the viewer
+        self._status_clear_pending = 0
+        self._listed_wins = None  # wins currently shown in win_store
         self._build_ui()
 
         # Initial state
@@ -69,7 +120,7 @@ class MultiboxerApp(Gtk.Window):
         self.pattern_entry.set_text(self.cfg.get("pattern", "World of Warcraft"))
         grid.attach(self.pattern_entry, 1, r, 2, 1)
         btn_rescan = Gtk.Button(label="Rescan")
-        btn_rescan.connect("clicked", lambda *_: self._rescan())
+        btn_rescan.connect("clicked", self._request_rescan)
         grid.attach(btn_rescan, 3, r, 1, 1)
         r += 1
 
@@ -95,7 +146,7 @@ class MultiboxerApp(Gtk.Window):
         self.layout_combo.set_active(0)
         grid.attach(self.layout_combo, 1, r, 2, 1)
         btn_layout = Gtk.Button(label="Apply")
-        btn_layout.connect("clicked", lambda *_: self._apply_layout())
+        btn_layout.connect("clicked", self._apply_layout)
         grid.attach(btn_layout, 3, r, 1, 1)
         r += 1
 
@@ -106,7 +157,7 @@ class MultiboxerApp(Gtk.Window):
         hbox = Gtk.Box(spacing=6); hbox.pack_start(self.size_w, True, True, 0); hbox.pack_start(Gtk.Label(label="x"), False, False, 0); hbox.pack_start(self.size_h, True, True, 0)
         grid.attach(hbox, 1, r, 2, 1)
         btn_min_all = Gtk.Button(label="Minimize all")
-        btn_min_all.connect("clicked", lambda *_: self._minimize_all())
+        btn_min_all.connect("clicked", self._minimize_all)
         grid.attach(btn_min_all, 3, r, 1, 1)
         r += 1
 
@@ -157,57 +208,37 @@ class MultiboxerApp(Gtk.Window):
         # Shortcuts
         grid.attach(Gtk.Label(label="Shortcuts (e.g., Alt+a, Control+s, Shift+F1, Alt+Control+Delete):"), 0, r, 4, 1); r += 1
 
-        grid.attach(Gtk.Label(label="Prev:"), 0, r, 1, 1)
-        self.short_prev = Gtk.Entry(); self.short_prev.set_text(self.cfg["shortcuts"].get("prev", "Alt+a"))
-        self.short_prev.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_prev, 1, r, 1, 1)
-
-        grid.attach(Gtk.Label(label="Next:"), 2, r, 1, 1)
-        self.short_next = Gtk.Entry(); self.short_next.set_text(self.cfg["shortcuts"].get("next", "Alt+d"))
-        self.short_next.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_next, 3, r, 1, 1)
-        r += 1
-
-        grid.attach(Gtk.Label(label="Minimize all:"), 0, r, 1, 1)
-        self.short_min = Gtk.Entry(); self.short_min.set_text(self.cfg["shortcuts"].get("minimize_all", "Alt+m"))
-        self.short_min.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_min, 1, r, 1, 1)
-
-        grid.attach(Gtk.Label(label="Close all:"), 2, r, 1, 1)
-        self.short_close_all = Gtk.Entry(); self.short_close_all.set_text(self.cfg["shortcuts"].get("close_all", "Alt+Delete"))
-        self.short_close_all.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_close_all, 3, r, 1, 1)
-        r += 1
-
-        grid.attach(Gtk.Label(label="Toggle overlay:"), 0, r, 1, 1)
-        self.short_toggle_overlay = Gtk.Entry(); self.short_toggle_overlay.set_text(self.cfg["shortcuts"].get("toggle_overlay", "Alt+o"))
-        self.short_toggle_overlay.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_toggle_overlay, 1, r, 1, 1)
-
-        grid.attach(Gtk.Label(label="Toggle broadcast:"), 2, r, 1, 1)
-        self.short_toggle_broadcast = Gtk.Entry(); self.short_toggle_broadcast.set_text(self.cfg["shortcuts"].get("toggle_broadcast", "Alt+b"))
-        self.short_toggle_broadcast.connect("changed", self._on_shortcuts_changed)
-        grid.attach(self.short_toggle_broadcast, 3, r, 1, 1)
-        r += 1
+        # two shortcut entries per row; self.shortcut_entries maps config key -> Gtk.Entry
+        self.shortcut_entries = {}
+        for i, (key, label) in enumerate(_SHORTCUT_FIELDS):
+            col = 2 * (i % 2)
+            grid.attach(Gtk.Label(label=label), col, r, 1, 1)
+            entry = Gtk.Entry(); entry.set_text(self.cfg["shortcuts"].get(key, config.DEFAULT_CONFIG["shortcuts"][key]))
+            entry.connect("changed", self._on_shortcuts_changed, key)
+            grid.attach(entry, col + 1, r, 1, 1)
+            self.shortcut_entries[key] = entry
+            if col:
+                r += 1
 
         grid.attach(Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL), 0, r, 4, 1); r += 1
 
         # Actions + Logs menu
         btn_save = Gtk.Button(label="Save config")
-        btn_save.connect("clicked", lambda *_: self._save_config())
+        btn_save.connect("clicked", self._save_config)
         grid.attach(btn_save, 0, r, 1, 1)
 
-        # Logs menu (Open / Clear)
+        # Logs menu (Open / Clear): a menu model + actions, no hand-built Gtk.Menu
+        log_actions = Gio.SimpleActionGroup()
+        for name, handler in (("open", self._open_log_viewer), ("clear", self._clear_log_file)):
+            action = Gio.SimpleAction.new(name, None)
+            action.connect("activate", handler)
+            log_actions.add_action(action)
+        self.insert_action_group("logs", log_actions)
+        log_menu = Gio.Menu()
+        log_menu.append("Open Logs", "logs.open")
+        log_menu.append("Clear Logs", "logs.clear")
         log_menu_btn = Gtk.MenuButton(label="Logs")
-        log_menu = Gtk.Menu()
-        view_log_item = Gtk.MenuItem(label="Open Logs")
-        clear_log_item = Gtk.MenuItem(label="Clear Logs")
-        view_log_item.connect("activate", self._open_log_viewer)
-        clear_log_item.connect("activate", self._clear_log_file)
-        log_menu.append(view_log_item)
-        log_menu.append(clear_log_item)
-        log_menu.show_all()
-        log_menu_btn.set_popup(log_menu)
+        log_menu_btn.set_menu_model(log_menu)
         grid.attach(log_menu_btn, 1, r, 1, 1)
 
         btn_quit = Gtk.Button(label="Quit")
@@ -220,82 +251,146 @@ class MultiboxerApp(Gtk.Window):
 
     # ---------------- Event handlers ----------------
 
+    def _request_rescan(self, *_):
+        """Rescan on the next idle; clicks arriving before it runs collapse into it."""
+        if not self._rescan_pending:
+            self._rescan_pending = True
+            GLib.idle_add(self._rescan_idle)
+
+    def _rescan_idle(self):
+        self._rescan_pending = False
+        self._rescan()
+        return False
+
     def _rescan(self):
         pattern = self.pattern_entry.get_text().strip()
-        wins = self.core.refresh_windows(pattern, custom_prefix="WoW Window")
-        self._update_win_list(wins)
+        self.core.refresh_windows_async(pattern, "WoW Window", self._update_win_list)
 
     def _update_win_list(self, wins):
+        if wins == self._listed_wins:
+            return
+        self._listed_wins = list(wins)
+        # refill detached from the view: one redraw instead of one per row
+        self.win_view.set_model(None)
         self.win_store.clear()
+        # insert_with_valuesv takes the typed values as-is (append() converts each row)
+        insert = self.win_store.insert_with_valuesv
         for i, w in enumerate(wins):
-            self.win_store.append([str(i+1), f"WoW Window {i+1} ({w})"])
+            insert(-1, (0, 1), (str(i+1), f"WoW Window {i+1} ({w})"))
+        self.win_view.set_model(self.win_store)
+
+    def _on_screen_size_changed(self, screen):
+        self._scr_w, self._scr_h = screen.get_width(), screen.get_height()
 
-    def _apply_layout(self):
+    def _apply_layout(self, *_):
         try:
             w = int(self.size_w.get_text()); h = int(self.size_h.get_text())
         except Exception:
             self._set_status("Invalid size")
             return
-        scr = Gdk.Screen.get_default()
         msg = self.core.apply_layout(
             self.layout_combo.get_active_text(), w, h,
-            scr.get_width(), scr.get_height()
+            self._scr_w, self._scr_h
         )
         self._set_status(msg)
 
-    def _minimize_all(self):
+    def _minimize_all(self, *_):
         self.core.minimize_all()
         self._set_status("All windows minimized")
 
     def _on_toggle_broadcast(self, *_):
         val = bool(self.broadcast_check.get_active())
         self.core.set_broadcast_enabled(val)
-        config.save_config(self.cfg)
+        self._mark_config_dirty()
 
     def _on_toggle_overlay(self, *_):
         val = bool(self.overlay_check.get_active())
         self.core.set_overlay_enabled(val)
-        config.save_config(self.cfg)
+        self._mark_config_dirty()
 
     def _on_color_change(self, *_):
         rgba = self.color_btn.get_rgba()
-        hex_color = "#{:02x}{:02x}{:02x}".format(
-            int(rgba.red * 255), int(rgba.green * 255), int(rgba.blue * 255)
-        )
+        hex_color = f"#{int(rgba.red * 255):02x}{int(rgba.green * 255):02x}{int(rgba.blue * 255):02x}"
+        if hex_color == self.cfg.get("overlay_color"):
+            return  # dragging within the same 8-bit colour
         self.core.set_overlay_color(hex_color)
-        config.save_config(self.cfg)
+        self._mark_config_dirty()
 
     def _on_font_change(self, *_):
         self.core.set_overlay_font_size(self.font_size_spin.get_value_as_int())
-        config.save_config(self.cfg)
+        self._mark_config_dirty()
 
     def _on_inhibit_change(self, *_):
-        keys = [s.strip() for s in self.inhibit_entry.get_text().split(",")]
-        self.core.set_inhibit_keys(keys)
+        self._defer_entry_commit("inhibit")
+
+    def _on_shortcuts_changed(self, _entry, key):
+        self._defer_entry_commit(key)
+
+    def _defer_entry_commit(self, what):
+        """what: "inhibit" or the config key of the shortcut entry that changed."""
+        # "changed" fires per typed character: apply only once typing pauses
+        self._entries_dirty.add(what)
+        if self._entry_commit_pending:
+            GLib.source_remove(self._entry_commit_pending)
+        self._entry_commit_pending = GLib.timeout_add(_ENTRY_COMMIT_DELAY_MS, self._commit_entries)
+
+    def _commit_entries(self):
+        self._entry_commit_pending = 0
+        dirty, self._entries_dirty = self._entries_dirty, set()
+        if "inhibit" in dirty:
+            dirty.discard("inhibit")
+            keys = [s.strip() for s in self.inhibit_entry.get_text().split(",")]
+            self.core.set_inhibit_keys(keys)
+        for key in dirty:  # only the shortcut entries that were edited
+            self.cfg["shortcuts"][key] = self.shortcut_entries[key].get_text().strip()
+            self.core.update_shortcut(key)
+        self._save_config_now()
+        return False
+
+    def _commit_entries_now(self) -> bool:
+        """Run a pending entry commit right away; True if there was one (config then saved)."""
+        if not self._entry_commit_pending:
+            return False
+        GLib.source_remove(self._entry_commit_pending)
+        self._commit_entries()
+        return True
+
+    def _mark_config_dirty(self):
+        # toggles and spinners can fire many times a second: coalesce into one write
+        if not self._config_save_pending:
+            self._config_save_pending = GLib.timeout_add(_CONFIG_SAVE_DELAY_MS, self._flush_config)
+
+    def _flush_config(self):
+        self._config_save_pending = 0
         config.save_config(self.cfg)
+        return False
 
-    def _on_shortcuts_changed(self, *_):
-        self.cfg["shortcuts"]["prev"] = self.short_prev.get_text().strip()
-        self.cfg["shortcuts"]["next"] = self.short_next.get_text().strip()
-        self.cfg["shortcuts"]["minimize_all"] = self.short_min.get_text().strip()
-        self.cfg["shortcuts"]["close_all"] = self.short_close_all.get_text().strip()
-        self.cfg["shortcuts"]["toggle_overlay"] = self.short_toggle_overlay.get_text().strip()
-        self.cfg["shortcuts"]["toggle_broadcast"] = self.short_toggle_broadcast.get_text().strip()
-        self.core.reparse_shortcuts()
-        config.save_config(self.cfg)
+    def _save_config_now(self):
+        if self._config_save_pending:
+            GLib.source_remove(self._config_save_pending)
+        self._flush_config()
 
-    def _save_config(self):
+    def _save_config(self, *_):
         self.cfg["pattern"] = self.pattern_entry.get_text().strip()
         try:
             self.cfg["window_size"] = [int(self.size_w.get_text()), int(self.size_h.get_text())]
         except Exception:
             pass
-        config.save_config(self.cfg)
+        if not self._commit_entries_now():
+            self._save_config_now()
         self._set_status("Configuration saved")
 
     def _set_status(self, text):
+        # one clear timer: a newer message restarts it instead of being blanked early
+        if self._status_clear_pending:
+            GLib.source_remove(self._status_clear_pending)
         self.status_label.set_text(text)
-        GLib.timeout_add_seconds(3, lambda: self.status_label.set_text("") or False)
+        self._status_clear_pending = GLib.timeout_add_seconds(3, self._clear_status)
+
+    def _clear_status(self):
+        self._status_clear_pending = 0
+        self.status_label.set_text("")
+        return False
 
     # ---------------- Logs ----------------
 
@@ -316,8 +411,19 @@ class MultiboxerApp(Gtk.Window):
         self.log_textview.set_editable(False)
         self.log_textview.set_monospace(True)
         self.log_textbuffer = self.log_textview.get_buffer()
-
+        self._log_stamp = None  # (size, mtime) of the log file last shown
+        self._log_pos = 0       # byte offset the viewer has read up to
         self._refresh_log_display()  # initial content
+
+        # follow appends as they happen instead of re-reading on Refresh
+        monitor = Gio.File.new_for_path(config.LOG_FILE).monitor_file(Gio.FileMonitorFlags.NONE, None)
+        monitor.connect("changed", self._on_log_file_changed)
+
+        def on_dialog_destroy(_w):
+            monitor.cancel()
+            self._cancel_log_fill()
+
+        dialog.connect("destroy", on_dialog_destroy)
         scrolled.add(self.log_textview)
 
         # Buttons
@@ -350,21 +456,93 @@ class MultiboxerApp(Gtk.Window):
         dialog.show_all()
 
     def _refresh_log_display(self):
-        """Refresh the log display in the viewer."""
+        """Show the tail of the log file in the viewer (no-op if the file is unchanged)."""
         try:
-            if os.path.exists(config.LOG_FILE):
-                with open(config.LOG_FILE, "r") as f:
-                    log_content = f.read()
-                self.log_textbuffer.set_text(log_content)
+            st = os.stat(config.LOG_FILE)
+        except FileNotFoundError:
+            self._log_stamp = None
+            self._show_log_text("Log file does not exist yet.")
+            return
+        except Exception as e:
+            self._log_stamp = None
+            self._show_log_text(f"Error reading log file: {e}")
+            return
+        stamp = (st.st_size, st.st_mtime_ns)
+        if stamp == self._log_stamp:
+            return
+        self._log_stamp = stamp
+        try:
+            with open(config.LOG_FILE, "rb") as f:
+                start = max(0, st.st_size - _LOG_TAIL_BYTES)
+                f.seek(start)
+                data = f.read()
+            self._log_pos = start + len(data)
+            if start:
+                data = data[data.find(b"\n") + 1:]  # don't start mid-line
+            self._show_log_text(data.decode("utf-8", "replace"))
+        except Exception as e:
+            self._show_log_text(f"Error reading log file: {e}")
 
+    def _on_log_file_changed(self, _monitor, _file, _other, event):
+        # no logging in here: the log file itself is what's being watched
+        if event not in (Gio.FileMonitorEvent.CHANGED, Gio.FileMonitorEvent.CREATED,
+                         Gio.FileMonitorEvent.DELETED):
+            return
+        try:
+            size = os.path.getsize(config.LOG_FILE)
+        except OSError:
+            size = -1
+        if size < self._log_pos or self._log_fill_pending:
+            # cleared/rotated, or still filling: reload the tail
+            self._refresh_log_display()
+            return
+        try:
+            with open(config.LOG_FILE, "rb") as f:
+                f.seek(self._log_pos)
+                data = f.read()
+        except OSError:
+            return
+        data = data[:data.rfind(b"\n") + 1]  # whole lines only; the rest comes next time
+        if not data:
+            return
+        self._log_pos += len(data)
+        self._log_stamp = None  # text no longer matches a full reload
+        end_iter = self.log_textbuffer.get_end_iter()
+        self.log_textbuffer.insert(end_iter, data.decode("utf-8", "replace"))
+        excess = self.log_textbuffer.get_char_count() - 2 * _LOG_TAIL_BYTES
+        if excess > 0:  # a long session keeps appending: keep the buffer bounded
+            buf = self.log_textbuffer
+            buf.delete(buf.get_start_iter(), buf.get_iter_at_offset(excess))
+        end_iter = self.log_textbuffer.get_end_iter()
+        self.log_textbuffer.place_cursor(end_iter)
+        self.log_textview.scroll_to_iter(end_iter, 0.0, False, 0.0, 0.0)
+
+    def _show_log_text(self, text):
+        """Replace the viewer's text, inserting big texts in chunks from idle callbacks."""
+        self._cancel_log_fill()
+        self.log_textbuffer.set_text("")
+        chunks = iter(range(0, len(text), _LOG_INSERT_CHUNK))
+
+        def insert_next():
+            pos = next(chunks, None)
+            if pos is None:
+                self._log_fill_pending = 0
                 # Scroll to end
                 end_iter = self.log_textbuffer.get_end_iter()
                 self.log_textbuffer.place_cursor(end_iter)
                 self.log_textview.scroll_to_iter(end_iter, 0.0, False, 0.0, 0.0)
-            else:
-                self.log_textbuffer.set_text("Log file does not exist yet.")
-        except Exception as e:
-            self.log_textbuffer.set_text(f"Error reading log file: {e}")
+                return False
+            self.log_textbuffer.insert(self.log_textbuffer.get_end_iter(),
+                                       text[pos:pos + _LOG_INSERT_CHUNK])
+            return True
+
+        if insert_next():  # first chunk right away, the rest between main loop iterations
+            self._log_fill_pending = GLib.idle_add(insert_next)
+
+    def _cancel_log_fill(self, *_):
+        if self._log_fill_pending:
+            GLib.source_remove(self._log_fill_pending)
+            self._log_fill_pending = 0
 
     def _clear_log_file(self, *_):
         """Clear the log file after confirmation."""
@@ -407,29 +585,26 @@ class MultiboxerApp(Gtk.Window):
     # ---------------- Lifecycle ----------------
 
     def on_destroy(self, *_):
+        if self._destroyed:  # teardown runs once, however many paths get here
+            return
+        self._destroyed = True
         try:
+            # don't lose a change made just before quitting
+            if not self._commit_entries_now() and self._config_save_pending:
+                self._save_config_now()
             self.core.stop()
         finally:
             Gtk.main_quit()
 
 
 def main():
-    if os.environ.get("XDG_SESSION_TYPE") == "wayland":
-        dialog = Gtk.MessageDialog(
-            transient_for=None,
-            flags=0,
-            message_type=Gtk.MessageType.ERROR,
-            buttons=Gtk.ButtonsType.OK,
-            text="Wayland not supported",
-        )
-        dialog.format_secondary_text("This application requires X11.")
-        dialog.run()
-        dialog.destroy()
-        sys.exit(1)
-
+    _refuse_wayland()
     app = MultiboxerApp()
     app.show_all()
     Gtk.main()
+    if not app._destroyed:  # quit via SIGINT skips on_destroy
+        if not app._commit_entries_now() and app._config_save_pending:
+            app._save_config_now()
 
 
 if __name__ == "__main__":
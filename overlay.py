@@ -7,11 +7,45 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GLib, Gdk
 
 # Import utilities to get window position
+import time
 import logging
+import functools
 import x11_utils
 
 # ------------------------- OVERLAY -------------------------
+_OVERLAY_SIZE = (120, 40)
+# get_window_geometry is two X round trips; reuse an answer this long (seconds)
+_GEOM_TTL = 0.25
+
+# Colore sempre quello configurato, sempre grassetto (niente logica 'is_active')
+_MARKUP_TMPL = ("<span size='{size}' weight='bold' foreground='{color}'>{index}</span>"
+                "  <span size='{icon_size}'>{dot}</span>")
+
+
+@functools.lru_cache(maxsize=64)
+def _build_markup(index, color, font_size, show_broadcast):
+    """Pango markup for one overlay state; few distinct states, so memoized."""
+    return _MARKUP_TMPL.format(
+        size=font_size, color=color,
+        index=f"#{index + 1}" if index is not None else "#?",
+        icon_size=int(font_size * 0.6),  # Icona scalabile
+        dot="🟢" if show_broadcast else "🔴",
+    )
+
+
 class Overlay:
+    # one Overlay per captured window, touched on every focus/broadcast change
+    __slots__ = ("winid", "index", "color", "font_size", "show_broadcast", "win", "label",
+                 "_shown_state", "_shown_markup", "_shown_pos", "_visible",
+                 "_applied", "_flush_pending", "_destroyed")
+
+    _geom_cache = {}  # winid -> (monotonic time, (x, y, w, h)), shared by all overlays
+
+    @classmethod
+    def invalidate_geometry(cls, winid):
+        """Forget the cached geometry of winid (it was moved/resized)."""
+        cls._geom_cache.pop(str(winid), None)
+
     def __init__(self, winid, index, color="#00FF00", font_size=36000, show_broadcast=True):
         self.winid = str(winid)
         self.index = index
@@ -44,24 +78,51 @@ class Overlay:
         self.win.set_default_size(160, 60) 
         
         self.label = Gtk.Label()
-        self.label.set_markup(self._markup())
+        self._shown_state = self._state()     # last state/markup/position/visibility asked for
+        self._shown_markup = self._markup()
+        self._shown_pos = None
+        self._visible = True
+        self.label.set_markup(self._shown_markup)
         self.win.add(self.label)
         self.win.show_all()
+        # what _flush last applied to GTK; all changes go through one idle callback
+        self._applied = {"markup": self._shown_markup, "pos": None, "size": None, "visible": True}
+        self._flush_pending = False
+        self._destroyed = False
+
+    def _state(self):
+        return (self.index, self.color, self.font_size, self.show_broadcast)
 
     def _markup(self):
-        dot = "🟢" if self.show_broadcast else "🔴"
-        icon_size = int(self.font_size * 0.6) # Icona scalabile
-        dot_span = f"<span size='{icon_size}'>{dot}</span>"
-        
-        # --- CORREZIONE COLORE ---
-        # Rimuoviamo la logica 'is_active'. Il colore è sempre self.color.
-        display_color = self.color 
-        display_weight = "bold" # Sempre grassetto, più visibile
-        # --- FINE CORREZIONE ---
+        return _build_markup(*self._state())
 
-        index_str = f"#{self.index + 1}" if self.index is not None else "#?"
-            
-        return f"<span size='{self.font_size}' weight='{display_weight}' foreground='{display_color}'>{index_str}</span>  {dot_span}"
+    def _schedule_flush(self):
+        if not self._flush_pending:
+            self._flush_pending = True
+            GLib.idle_add(self._flush, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def _flush(self):
+        """Apply the latest requested markup/position/visibility in one go."""
+        self._flush_pending = False
+        if self._destroyed:
+            return False
+        applied = self._applied
+        if self._shown_markup != applied["markup"]:
+            applied["markup"] = self._shown_markup
+            self.label.set_markup(self._shown_markup)
+        if self._shown_pos is not None and self._shown_pos != applied["pos"]:
+            applied["pos"] = self._shown_pos
+            self.win.move(*self._shown_pos)
+            if applied["size"] != _OVERLAY_SIZE:
+                applied["size"] = _OVERLAY_SIZE
+                self.win.resize(*_OVERLAY_SIZE)
+        if self._visible != applied["visible"]:
+            applied["visible"] = self._visible
+            if self._visible:
+                self.win.show_all()
+            else:
+                self.win.hide()
+        return False
 
     def update(self, index=None, color=None, font_size=None, show_broadcast=None, is_active=None):
         # 'is_active' viene ricevuto ma ignorato, non ci serve più qui
@@ -69,24 +130,44 @@ class Overlay:
         if color is not None: self.color = color
         if font_size is not None: self.font_size = font_size
         if show_broadcast is not None: self.show_broadcast = show_broadcast
-        
-        GLib.idle_add(self.label.set_markup, self._markup())
+
+        state = self._state()
+        if state == self._shown_state:  # skip the redraw when nothing visible changed
+            return
+        self._shown_state = state
+        self._shown_markup = self._markup()
+        self._schedule_flush()
 
     def place_on_window(self):
         try:
-            # Use the imported utility function
-            x,y,w,h = x11_utils.get_window_geometry(self.winid)
+            now = time.monotonic()
+            cached = self._geom_cache.get(self.winid)
+            if cached is not None and now - cached[0] < _GEOM_TTL:
+                x,y,w,h = cached[1]
+            else:
+                # Use the imported utility function
+                x,y,w,h = x11_utils.get_window_geometry(self.winid)
+                self._geom_cache[self.winid] = (now, (x,y,w,h))
             offx = 8; offy = 8
-            GLib.idle_add(self.win.move, x+offx, y+offy)
-            GLib.idle_add(self.win.resize, 120, 40)
+            pos = (x+offx, y+offy)
+            if pos == self._shown_pos:
+                return
+            self._shown_pos = pos
+            self._schedule_flush()
         except Exception:
             pass
 
     def hide(self):
-        GLib.idle_add(self.win.hide)
+        if self._visible:
+            self._visible = False
+            self._schedule_flush()
 
     def show(self):
-        GLib.idle_add(self.win.show_all)
+        if not self._visible:
+            self._visible = True
+            self._schedule_flush()
 
     def destroy(self):
-        GLib.idle_add(self.win.destroy)
\ No newline at end of file
+        self._destroyed = True
+        self.invalidate_geometry(self.winid)
+        GLib.idle_add(self.win.destroy)
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 # shortcuts.py — parse/normalize and match shortcuts against config
 
-from typing import Optional, Tuple, List
+import sys
+import functools
+from typing import Dict, Optional, Tuple, List
 
 
-_CANON_ORDER = ["alt", "control", "shift"]  # fixed order
+_CANON_ORDER = ("alt", "control", "shift")  # fixed order
+_CANON_SET = frozenset(_CANON_ORDER)
 
+# Modifier bits for the tuple form of a combo: (mod_mask, key_name)
+MOD_ALT, MOD_CONTROL, MOD_SHIFT = 1, 2, 4
+_MOD_BITS = {"alt": MOD_ALT, "control": MOD_CONTROL, "shift": MOD_SHIFT}
 
+# other spellings of the canonical modifiers, accepted by strict_shortcut_tuple
+_MOD_ALIASES = {
+    "ctrl": "control", "control_l": "control", "control_r": "control",
+    "alt_l": "alt", "alt_r": "alt", "shift_l": "shift", "shift_r": "shift",
+}
+
+
+@functools.lru_cache(maxsize=256)
 def normalize_shortcut(spec: str) -> str:
     """
     Normalize "Alt+Shift+F1" -> "alt+shift+f1" with canonical modifier order.
-    Empty/None -> ""
+    Empty/None -> "". Pure and called with a handful of distinct specs, so memoized.
     """
     if not spec:
         return ""
@@ -18,9 +32,41 @@ def normalize_shortcut(spec: str) -> str:
     if not parts:
         return ""
     key = parts[-1]
-    mods = [p for p in parts[:-1] if p in _CANON_ORDER]
-    ordered = [m for m in _CANON_ORDER if m in mods]
-    return "+".join(ordered + [key])
+    mods = _CANON_SET.intersection(parts[:-1])
+    return "+".join([m for m in _CANON_ORDER if m in mods] + [key])
+
+
+def shortcut_tuple(spec: str) -> Optional[Tuple[int, str]]:
+    """
+    "Alt+Shift+F1" -> (MOD_ALT | MOD_SHIFT, "f1"). Empty/None -> None
+    """
+    norm = normalize_shortcut(spec)
+    if not norm:
+        return None
+    *mods, key = norm.split("+")
+    mask = 0
+    for m in mods:
+        mask |= _MOD_BITS[m]
+    return (mask, sys.intern(key))  # interned: lookups with interned names compare by identity
+
+
+def strict_shortcut_tuple(spec: str) -> Optional[Tuple[int, str]]:
+    """
+    Like shortcut_tuple, but modifier aliases ("ctrl", "alt_r") are mapped and a
+    spec with any other modifier ("super+x") is None instead of the bare key.
+    """
+    if not spec:
+        return None
+    parts = [p.strip().lower() for p in spec.split("+") if p.strip()]
+    if not parts:
+        return None
+    mask = 0
+    for m in parts[:-1]:
+        bit = _MOD_BITS.get(_MOD_ALIASES.get(m, m))
+        if bit is None:
+            return None
+        mask |= bit
+    return (mask, sys.intern(parts[-1]))
 
 
 class ShortcutHandler:
@@ -42,46 +88,70 @@ class ShortcutHandler:
 
     def all_shortcut_combos(self) -> List[str]:
         """All known combos (normalized)."""
-        combos = list(self._action_map.keys())
-        combos += [c for c, _ in self._window_indices]
-        return combos
+        return list(self._combo_map.keys())
 
     def match(self, combo_now: str) -> Optional[Tuple[str, object]]:
         """
         combo_now is already normalized via normalize_shortcut.
         """
-        if not combo_now:
-            return None
-
-        # Exact action match?
-        action = self._action_map.get(combo_now)
-        if action:
-            return ("action", action)
+        return self._combo_map.get(combo_now)
 
-        # Window index?
-        for c, idx in self._window_indices:
-            if combo_now == c:
-                return ("window", idx)
+    def match_tuple(self, mod_mask: int, key_name: str) -> Optional[Tuple[str, object]]:
+        """
+        Same as match() but keyed by (mod_mask, key_name), so callers on the
+        key path don't have to build the combo string.
+        """
+        return self._tuple_map.get((mod_mask, key_name))
 
-        return None
+    def update_action(self, action_key: str, spec: str) -> bool:
+        """
+        Rebind one action to spec (config already holds it), patching the maps
+        in place. Returns False if the normalized combo didn't change.
+        """
+        old = self._action_combos.get(action_key, "")
+        new = normalize_shortcut(spec)
+        if new == old:
+            return False
+        if old in self._contested or new in self._combo_map:
+            self._rebuild()  # colliding combos: let _rebuild settle precedence
+            return True
+        if old:
+            del self._combo_map[old]
+            del self._tuple_map[shortcut_tuple(old)]
+            del self._action_combos[action_key]
+        if new:
+            self._combo_map[new] = self._tuple_map[shortcut_tuple(new)] = ("action", action_key)
+            self._action_combos[action_key] = new
+        return True
 
     # -------- internal --------
 
     def _rebuild(self):
         sc = self._cfg.get("shortcuts", {}) or {}
 
-        # Map normalized combo -> action name
-        self._action_map = {}
+        # Map normalized combo -> match() result; actions win over window keys
+        self._combo_map: Dict[str, Tuple[str, object]] = {}
+        self._action_combos = {}  # action -> the combo it currently owns in _combo_map
+        self._contested = set()   # combos claimed by more than one shortcut
         for action_key in ("prev", "next", "minimize_all", "close_all",
                            "toggle_broadcast", "toggle_overlay"):
             combo = normalize_shortcut(sc.get(action_key, ""))
             if combo:
-                self._action_map[combo] = action_key
+                prev_owner = self._combo_map.get(combo)
+                if prev_owner:
+                    self._contested.add(combo)
+                    del self._action_combos[prev_owner[1]]
+                self._combo_map[combo] = ("action", action_key)
+                self._action_combos[action_key] = combo
 
         # Window index shortcuts (list)
-        window_keys = self._cfg.get("shortcuts", {}).get("window_keys", []) or []
-        self._window_indices = []
+        window_keys = sc.get("window_keys", []) or []
         for idx, combo in enumerate(window_keys):
             norm = normalize_shortcut(combo)
             if norm:
-                self._window_indices.append((norm, idx))
+                if norm in self._combo_map:
+                    self._contested.add(norm)
+                self._combo_map.setdefault(norm, ("window", idx))
+
+        # (mod_mask, key) -> match() result
+        self._tuple_map = {shortcut_tuple(c): m for c, m in self._combo_map.items()}
@@ -3,18 +3,41 @@
 # All utility functions for interacting with X11, wmctrl, and xdotool.
 
 import os
+import re
+import time
+import threading
 import subprocess
 import logging
-from Xlib import X, XK, display
-
-from pynput import keyboard
-import subprocess
-import shlex
+from contextlib import contextmanager
+from Xlib import X, Xatom, display
+from Xlib import error as Xerror
+from Xlib.protocol import event
 
 # Import path from config
 from config import TMP_WINS_FILE
 
 # ------------------------- UTILITIES -------------------------
+# fire-and-forget children from spawn_detached(), reaped on later calls
+_spawned = set()
+_spawned_lock = threading.Lock()
+# stdout/stderr of detached children -> /dev/null
+_DEVNULL_OUT = [(os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0), (os.POSIX_SPAWN_DUP2, 1, 2)]
+
+def spawn_detached(argv):
+    """
+    Start argv (looked up in PATH) without waiting for it, output discarded.
+    posix_spawn instead of subprocess.Popen: no fork of this (big, threaded)
+    process and no exec-error pipe. Finished children are reaped on later calls.
+    """
+    with _spawned_lock:
+        for pid in list(_spawned):
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    _spawned.discard(pid)
+            except ChildProcessError:
+                _spawned.discard(pid)
+        _spawned.add(os.posix_spawnp(argv[0], argv, os.environ, file_actions=_DEVNULL_OUT))
+
 def run_cmd(args):
     """Helper to run a command and return output"""
     try:
@@ -22,60 +45,61 @@ def run_cmd(args):
     except subprocess.CalledProcessError:
         return ""
 
-def rescan_windows(pattern):
+# save_window_list() hand-off to the writer thread: only the latest list is written
+_wins_pending = None
+_wins_lock = threading.Lock()
+_wins_ready = threading.Event()
+_wins_writer = None
+_wins_fd = None  # TMP_WINS_FILE, opened once by the writer thread
+
+def save_window_list(wins):
     """
-    Returns list of window ids (decimal strings) matching pattern via xdotool.
-    Saves to /tmp/multiboxer_windows
-    Uses --onlyvisible and filters out this script's PID.
+    Saves window ids to /tmp/multiboxer_windows, one per line, from a writer
+    thread: callers (the GTK thread, on every rescan) don't wait on the disk, and
+    lists saved faster than they can be written collapse into the last one.
     """
-    wins = []
-    try:
-        out = subprocess.check_output(['xdotool','search','--onlyvisible','--name', pattern]).decode().strip()
-        ids = [l.strip() for l in out.splitlines() if l.strip()]
-    except subprocess.CalledProcessError:
-        ids = []
-
-    # remove duplicati
-    seen = set()
-    ids_uniq = []
-    for wid in ids:
-        if wid not in seen:
-            seen.add(wid)
-            ids_uniq.append(wid)
+    global _wins_pending, _wins_writer
+    with _wins_lock:
+        _wins_pending = list(wins)
+        if _wins_writer is None:
+            _wins_writer = threading.Thread(target=_window_list_writer, name="wins-writer", daemon=True)
+            _wins_writer.start()
+    _wins_ready.set()
 
-    # filtra finestre del processo corrente
-    pid_self = str(os.getpid())
-    filtered = []
-    for wid in ids_uniq:
-        try:
-            pid = subprocess.check_output(['xdotool','getwindowpid', wid]).decode().strip()
-            if pid == pid_self:
-                logging.debug(f"Filtered out own window {wid} with PID {pid}")
-                continue
-        except subprocess.CalledProcessError:
-            pass # Window might have closed
-        filtered.append(wid)
+def _window_list_writer():
+    global _wins_pending
+    while True:
+        _wins_ready.wait()
+        with _wins_lock:
+            _wins_ready.clear()
+            wins, _wins_pending = _wins_pending, None
+        if wins is not None:
+            _write_window_list(wins)
 
-    # save
+def _write_window_list(wins):
+    """Rewrite the file in place through one fd kept open by the writer thread."""
+    global _wins_fd
     try:
-        with open(TMP_WINS_FILE, "w") as f:
-            f.write("\n".join(filtered))
+        if _wins_fd is not None and os.fstat(_wins_fd).st_nlink == 0:
+            os.close(_wins_fd)  # someone removed the file: don't keep writing to the orphan
+            _wins_fd = None
+        if _wins_fd is None:
+            _wins_fd = os.open(TMP_WINS_FILE, os.O_WRONLY | os.O_CREAT, 0o644)
+        data = "\n".join(wins).encode()
+        # truncate first: a reader must never see stale ids past the new end
+        os.ftruncate(_wins_fd, 0)
+        os.pwrite(_wins_fd, data, 0)
     except Exception as e:
         logging.exception("Error writing tmp windows file: %s", e)
-        
-    logging.info("Rescanned windows: %s", filtered)
-    return filtered
 
-def set_window_title(winid, title):
+def list_windows_with_titles():
     """
-    Tenta di impostare il titolo di una finestra usando xdotool.
+    Returns [(winid, title), ...] for every managed window, in wmctrl order,
+    from a single 'wmctrl -lpG' call. winid is decimal string.
+    Filters out this script's own windows.
     """
-    logging.debug(f"Tentativo di rinominare {winid} in '{title}'")
-    try:
-        cmd = ['xdotool', 'set_window', '--name', title, str(winid)]
-        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception as e:
-        logging.exception(f"Errore in set_window_title per {winid}: {e}")
+    pid_self = str(os.getpid())
+    return [(wid, t[-1]) for wid, t in wmctrl_list().items() if t[0] != pid_self]
 
 def get_window_name(win_id):
     """Prende il nome della finestra dall'ID"""
@@ -87,6 +111,13 @@ def get_window_name(win_id):
     except subprocess.CalledProcessError:
         return ""
 
+# one 'wmctrl -lpG' line: id desktop pid x y w h host [title]
+_WMCTRL_LINE = re.compile(
+    r"^(0x[0-9a-fA-F]+)[ \t]+(-?\d+)[ \t]+(\d+)[ \t]+(-?\d+)[ \t]+(-?\d+)"
+    r"[ \t]+(\d+)[ \t]+(\d+)[ \t]+\S+(?:[ \t]+(.*))?$",
+    re.M,
+)
+
 def wmctrl_list():
     """
     returns dict winid -> (pid, desktop, x,y,w,h,title)
@@ -94,166 +125,204 @@ def wmctrl_list():
     Uses 'wmctrl -lpG'
     """
     out = run_cmd(['wmctrl','-lpG'])
-    d = {}
-    for line in out.splitlines():
-        parts = line.split(None, 7)
-        if len(parts) < 8: continue
-        wid_hex, desktop, pid, x, y, w, h, title = parts
-        try:
-            winid = str(int(wid_hex, 16))
-            d[winid] = (pid, desktop, int(x), int(y), int(w), int(h), title)
-        except Exception:
-            logging.warning(f"Could not parse wmctrl line: {line}")
-    return d
+    return {
+        str(int(m[1], 16)): (m[3], m[2], int(m[4]), int(m[5]), int(m[6]), int(m[7]), m[8] or "")
+        for m in _WMCTRL_LINE.finditer(out)
+    }
 
 def get_window_geometry(winid):
-    """Gets window geometry (x, y, w, h) from wmctrl_list or fallback."""
-    m = wmctrl_list().get(str(winid))
-    if m:
-        # m is (pid, desktop, x, y, w, h, title)
-        return m[2], m[3], m[4], m[5]
-    # fallback
+    """
+    Gets window geometry (x, y, w, h), x/y absolute on the root window: one
+    GetGeometry + TranslateCoords on this thread's X connection. (0,0,100,40) if gone.
+    """
     try:
-        out = run_cmd(['xwininfo','-id', str(winid)])
-        x=y=w=h=0
-        for l in out.splitlines():
-            if "Absolute upper-left X" in l:
-                x = int(l.split(":")[1])
-            if "Absolute upper-left Y" in l:
-                y = int(l.split(":")[1])
-            if "Width" in l:
-                w = int(l.split(":")[1])
-            if "Height" in l:
-                h = int(l.split(":")[1])
-        return x,y,w,h
-    except:
+        d = _thread_display()
+        win = d.create_resource_object("window", int(winid))
+        g = win.get_geometry()
+        t = d.screen().root.translate_coords(win, 0, 0)
+        return t.x, t.y, g.width, g.height
+    except (Xerror.XError, ValueError):
         return 0,0,100,40
 
+# ------------------------- XLIB REQUESTS -------------------------
+# Window management goes straight to the X server (same EWMH client messages
+# wmctrl sends), so a layout is a burst of requests instead of one wmctrl per window.
+_xdisplay = None
+_local = threading.local()  # per-thread connections (_thread_display) and batched() depth
+# activate_window gives the WM this long to make the window active (seconds)
+_ACTIVATE_TIMEOUT = 0.5
+
+def _display():
+    global _xdisplay
+    if _xdisplay is None:
+        _xdisplay = display.Display()
+    return _xdisplay
+
+def _flush():
+    """Flush pending requests, unless inside batched()."""
+    if not getattr(_local, "batch_depth", 0):
+        _display().flush()
+
+@contextmanager
+def batched():
+    """
+    Queue the X requests issued inside the block; one sync() at the end.
+    The nesting depth is per thread: another thread's batch doesn't hold back our flushes.
+    """
+    depth = getattr(_local, "batch_depth", 0)
+    _local.batch_depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.batch_depth = depth
+        if not depth:
+            try:
+                _display().sync()
+            except Exception:
+                logging.exception("X sync failed")
+
+def _client_message(winid, type_name, data):
+    """Send an EWMH client message for winid to the root window (the WM)."""
+    d = _display()
+    root = d.screen().root
+    ev = event.ClientMessage(
+        window=d.create_resource_object("window", int(winid)),
+        client_type=d.intern_atom(type_name),
+        data=(32, (list(data) + [0] * 5)[:5]),
+    )
+    root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+    _flush()
+
+def _set_wm_state(winid, *state_names):
+    d = _display()
+    atoms = [d.intern_atom(n) for n in state_names] + [0]
+    _client_message(winid, "_NET_WM_STATE", [1, atoms[0], atoms[1], 2])  # _NET_WM_STATE_ADD, source = pager
+
+def _put_title(d, winid, title, onerror=None):
+    win = d.create_resource_object("window", int(winid))
+    win.change_property(d.intern_atom("_NET_WM_NAME"), d.intern_atom("UTF8_STRING"), 8,
+                        title.encode("utf-8"), onerror=onerror)
+    win.change_property(Xatom.WM_NAME, Xatom.STRING, 8, title.encode("latin-1", "replace"),
+                        onerror=onerror)
+
+def set_window_title(winid, title):
+    """
+    Sets a window's title (_NET_WM_NAME and WM_NAME, like xdotool set_window --name).
+    Flushed immediately unless inside batched().
+    """
+    logging.debug("Tentativo di rinominare %s in '%s'", winid, title)
+    try:
+        _put_title(_display(), winid, title)
+        _flush()
+    except Exception as e:
+        logging.exception(f"Errore in set_window_title per {winid}: {e}")
+
+def set_window_titles(pairs):
+    """
+    set_window_title for many (winid, title) pairs, with a single sync.
+    X reports errors asynchronously, so each window gets its own CatchError;
+    returns the winids that could not be retitled (e.g. BadWindow: closed meanwhile).
+    """
+    failed, caught = [], []
+    with batched():
+        d = _display()
+        for winid, title in pairs:
+            catch = Xerror.CatchError()
+            try:
+                _put_title(d, winid, title, onerror=catch)
+            except Exception:
+                failed.append(winid)
+                continue
+            caught.append((winid, catch))
+    # batched() has synced: every error for these requests has been handled by now
+    failed += [winid for winid, catch in caught if catch.get_error()]
+    return failed
+
 def move_resize_window(winid, x, y, w, h):
-    geom = f"0,{x},{y},{w},{h}"
-    subprocess.call(['wmctrl','-ir', str(winid), '-e', geom])
+    # gravity 0 (the window's own win_gravity), x/y/w/h all present, source = pager
+    # (like wmctrl -e 0,x,y,w,h)
+    flags = (0xF << 8) | (2 << 12)
+    _client_message(winid, "_NET_MOVERESIZE_WINDOW", [flags, x, y, w, h])
 
 def maximize_window(winid):
-    subprocess.call(['wmctrl','-ir', str(winid), '-b', 'add,maximized_vert,maximized_horz'])
+    _set_wm_state(winid, "_NET_WM_STATE_MAXIMIZED_VERT", "_NET_WM_STATE_MAXIMIZED_HORZ")
 
 def minimize_window(winid):
-    subprocess.call(['wmctrl','-ir', str(winid), '-b', 'add,hidden'])
+    _set_wm_state(winid, "_NET_WM_STATE_HIDDEN")
+
+def _thread_display():
+    """
+    A connection of the calling thread's own. Activation runs on worker threads
+    (core's activate thread, the broadcaster's sweep), which must not share _display().
+    """
+    d = getattr(_local, "display", None)
+    if d is None:
+        d = _local.display = display.Display()
+    return d
+
+def _read_active_window(d, root):
+    prop = root.get_full_property(d.intern_atom("_NET_ACTIVE_WINDOW"), Xatom.WINDOW)
+    return prop.value[0] if prop is not None and len(prop.value) else 0
 
 def get_active_window():
     """Restituisce l'ID della finestra attiva (come stringa) o una stringa vuota."""
     try:
-        # Usiamo check_output per catturare l'output
-        out = subprocess.check_output(
-            ["xdotool", "getactivewindow"], stderr=subprocess.DEVNULL
-        ).decode().strip()
-        return out if out else ""
-    except subprocess.CalledProcessError:
+        d = _thread_display()
+        wid = _read_active_window(d, d.screen().root)
+        return str(wid) if wid else ""
+    except Exception:
+        logging.debug("get_active_window failed", exc_info=True)
         return ""
 
 def activate_window(winid):
-    """Focuses/activates a window using xdotool."""
+    """
+    Focuses/activates a window (EWMH _NET_ACTIVE_WINDOW to the WM) and, like
+    'xdotool windowactivate --sync', waits until it is the active one. Unlike
+    xdotool it doesn't switch to the window's desktop first.
+    """
     try:
-        subprocess.call(['xdotool','windowactivate','--sync', str(winid)])
+        d = _thread_display()
+        root = d.screen().root
+        wid = int(winid)
+        ev = event.ClientMessage(
+            window=d.create_resource_object("window", wid),
+            client_type=d.intern_atom("_NET_ACTIVE_WINDOW"),
+            data=(32, [2, X.CurrentTime, 0, 0, 0]),  # source: pager
+        )
+        root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+        d.flush()
+        deadline = time.monotonic() + _ACTIVATE_TIMEOUT
+        while _read_active_window(d, root) != wid:
+            if time.monotonic() >= deadline:
+                logging.debug("activate_window: %s not active after %.1fs", winid, _ACTIVATE_TIMEOUT)
+                break
+            time.sleep(0.005)
     except Exception as e:
         logging.exception("activate_window error for win %s: %s", winid, e)
 
 def close_window(winid):
-    """Sends a close signal to the window."""
-    try:
-        cmd = ['xdotool','windowclose', str(winid)]
-        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception as e:
-        logging.exception("close_window Popen error for win %s: %s", winid, e)
-
-# ------------------------- KEY GRABBING -------------------------
-def grab_key(window, keyname, modifier_mask=X.AnyModifier):
-    """Grab a key on the specified window with optional modifier mask."""
-    try:
-        # Use the global display instance
-        from Xlib import display as xdisplay
-        d = xdisplay.Display()
-        
-        keysym = XK.string_to_keysym(keyname)
-        if keysym == 0:
-            # Try with "Key_" prefix for special keys
-            keysym = XK.string_to_keysym("Key_" + keyname)
-        if keysym == 0:
-            logging.warning(f"Could not find keysym for key: {keyname}")
-            return None
-            
-        keycode = d.keysym_to_keycode(keysym)
-        if keycode == 0:
-            logging.warning(f"Could not find keycode for keysym: {keysym} ({keyname})")
-            return None
-            
-        window.grab_key(keycode, modifier_mask, True,
-                       X.GrabModeAsync, X.GrabModeAsync)
-        logging.debug(f"Successfully grabbed key: {keyname} (keycode: {keycode}, modifiers: {modifier_mask})")
-        return keycode
-    except Exception as e:
-        logging.exception(f"Error grabbing key {keyname}")
-        return None
-
-def ungrab_key(window, keycode, modifier_mask=X.AnyModifier):
-    """Ungrab a key on the specified window."""
+    """
+    Destroys the window (what 'xdotool windowclose' does), over the calling
+    thread's own connection, so the close_all shortcut is safe from any thread.
+    """
     try:
-        window.ungrab_key(keycode, modifier_mask)
-        logging.debug(f"Successfully ungrabbed keycode: {keycode}")
+        d = _thread_display()
+        d.create_resource_object("window", int(winid)).destroy()
+        d.flush()
     except Exception as e:
-        logging.warning(f"Error ungrabbing keycode {keycode}: {e}")
+        logging.exception("close_window error for win %s: %s", winid, e)
 
 def send_key_to_window(winid, key_sequence):
     """
     Send a key sequence to a specific window using xdotool.
-    key_sequence: can be single key "a" or modified "alt+a"
+    key_sequence: can be single key "a" or modified "alt+a" (xdotool parses the
+    '+' combo itself, so it goes through as one argument)
     """
     try:
-        # Convert key sequence to xdotool format
-        if '+' in key_sequence:
-            # It's a modified key like "alt+a"
-            parts = key_sequence.split('+')
-            modifiers = parts[:-1]
-            key = parts[-1]
-            
-            # Build xdotool command
-            cmd = ['xdotool', 'key', '--window', str(winid)]
-            for mod in modifiers:
-                cmd.append(f'{mod.lower()}+')
-            cmd.append(key.lower())
-            
-            # Flatten the command
-            flat_cmd = []
-            for item in cmd:
-                if item.endswith('+'):
-                    flat_cmd.append(item[:-1])  # Remove trailing +
-                    flat_cmd.append('+')
-                else:
-                    flat_cmd.append(item)
-            # Remove any trailing +
-            if flat_cmd and flat_cmd[-1] == '+':
-                flat_cmd.pop()
-                
-            subprocess.Popen(flat_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        else:
-            # Simple key
-            cmd = ['xdotool', 'key', '--window', str(winid), key_sequence.lower()]
-            subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-        logging.debug(f"Sent key '{key_sequence}' to window {winid}")
+        spawn_detached(['xdotool', 'key', '--window', str(winid), '--', key_sequence.lower()])
+        logging.debug("Sent key '%s' to window %s", key_sequence, winid)
         return True
-        
+
     except Exception as e:
-        logging.error(f"Error sending key to window {winid}: {e}")
+        logging.error("Error sending key to window %s: %s", winid, e)
         return False
-
-def broadcast_key_to_windows(key_sequence, target_windows, exclude_window=None):
-    """
-    Broadcast a key sequence to all target windows except the exclude_window.
-    """
-    success_count = 0
-    for winid in target_windows:
-        if winid != exclude_window:
-            if send_key_to_window(winid, key_sequence):
-                success_count += 1
-    logging.debug(f"Broadcast '{key_sequence}' to {success_count} windows (excluded: {exclude_window})")
-    return success_count
\ No newline at end of file